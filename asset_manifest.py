@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+
+from PIL import Image
+
+# File    : asset_manifest.py
+# Classes : AssetManifest
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : An index of every asset the battlemap is drawn with, kept in assets/manifest.json. For each category
+#               (exterior walls, doors, ...) it lists the variants in order, with each one's path, dimensions,
+#               whether it has alpha and a hash of its contents. It is loaded once, with the paths resolved for this
+#               operating system, so the renderer picks variants without searching the file system. Run this
+#               directly after adding or changing assets to write the manifest again: 'python asset_manifest.py'.
+
+MANIFEST_FORMAT = 'dungeonify-assets'
+MANIFEST_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+# category --> (directory under the assets root, file extension). Only files directly in the directory are included.
+ASSET_CATEGORIES = {
+    'exteriorFloors': ('floor/exterior', '.jpg'),
+    'interiorFloors': ('floor/interior', '.jpg'),
+    'specialityFloors': ('floor/special', '.jpg'),
+    'pillars': ('pillar/wood', '.png'),
+    'specialityPillars': ('pillar/special', '.png'),
+    'exteriorWalls': ('wall/exterior', '.png'),
+    'interiorWalls': ('wall/interior', '.png'),
+    'doors': ('door/single', '.png'),
+    'windows': ('window', '.png'),
+    'sills': ('sill', '.png'),
+    'specialityWalls': ('wall/special', '.png'),
+    'specialityDoors': ('door/single/special', '.png'),
+    'specialitySills': ('sill/special', '.png'),
+    'specialityWindows': ('window/special', '.png'),
+}
+
+
+class AssetManifest:
+    def __init__(self, manifest, root='assets'):
+        self.root = root
+        self.manifest = manifest
+
+    # Loads the manifest under root, or makes it from the assets when it is missing or no longer matches them.
+    @classmethod
+    def load(cls, root='assets', write=True):
+        try:
+            with open(os.path.join(root, MANIFEST_FILE), 'r', encoding='utf-8') as manifestFile:
+                manifest = json.load(manifestFile)
+        except (OSError, ValueError):
+            manifest = None
+
+        if manifest is not None and manifest.get('format') == MANIFEST_FORMAT and \
+                manifest.get('version') == MANIFEST_FORMAT_VERSION:
+            assetManifest = cls(manifest, root)
+            if not assetManifest.isStale():
+                return assetManifest
+
+        assetManifest = cls(buildManifest(root), root)
+        if write:
+            assetManifest.write()
+        return assetManifest
+
+    def write(self):
+        with open(os.path.join(self.root, MANIFEST_FILE), 'w', encoding='utf-8') as manifestFile:
+            json.dump(self.manifest, manifestFile, indent=4)
+            manifestFile.write('\n')
+
+    # The full path of an asset, from its path in the manifest which always uses '/'.
+    def resolve(self, relativePath):
+        return os.path.join(self.root, *relativePath.split('/'))
+
+    # The manifest entries of every variant of the category, in order.
+    def variants(self, category):
+        return self.manifest['categories'].get(category, [])
+
+    # The full path of every variant of the category, in order.
+    def paths(self, category):
+        paths = [self.resolve(variant['path'])
+                 for variant in self.variants(category)]
+        if len(paths) == 0:
+            raise FileNotFoundError(f"No assets Found in '{category}'")
+        return paths
+
+    # True when the asset files are not the ones listed: added, removed, or changed. A file edited without changing
+    # its size is found by its hash, so every file is hashed again (about 10 ms for the assets shipped). Modification
+    # times are not used, as a checkout or copy changes them, which would rewrite the tracked manifest.
+    def isStale(self):
+        for category, (directory, extension) in ASSET_CATEGORIES.items():
+            listed = {variant['path']: (variant['bytes'], variant['sha1'])
+                      for variant in self.variants(category)}
+            found = {path for fileName, path in categoryFiles(self.root, directory, extension)}
+            if set(listed) != found:
+                return True
+
+            for path, (size, sha1) in listed.items():
+                # The size is checked first, as it needs no reading.
+                if os.path.getsize(self.resolve(path)) != size or fileHash(self.resolve(path)) != sha1:
+                    return True
+        return False
+
+
+# The (file name, path relative to the root with '/') of every asset of a category, sorted by file name.
+def categoryFiles(root, directory, extension):
+    fullDirectory = os.path.join(root, *directory.split('/'))
+    try:
+        fileNames = sorted(os.listdir(fullDirectory))
+    except OSError:
+        return []
+
+    return [(fileName, directory + '/' + fileName) for fileName in fileNames
+            if fileName.lower().endswith(extension) and os.path.isfile(os.path.join(fullDirectory, fileName))]
+
+
+def fileHash(path):
+    with open(path, 'rb') as assetFile:
+        return hashlib.sha1(assetFile.read()).hexdigest()
+
+
+def buildManifest(root='assets'):
+    categories = {}
+    for category, (directory, extension) in ASSET_CATEGORIES.items():
+        variants = []
+        for fileName, path in categoryFiles(root, directory, extension):
+            fullPath = os.path.join(root, *path.split('/'))
+            with open(fullPath, 'rb') as assetFile:
+                contents = assetFile.read()
+            # Opening only reads the header, the image is not decoded.
+            with Image.open(fullPath) as image:
+                width, height = image.size
+                alpha = 'A' in image.getbands() or 'transparency' in image.info
+
+            variants.append({'path': path, 'width': width, 'height': height, 'alpha': alpha,
+                             'bytes': len(contents), 'sha1': hashlib.sha1(contents).hexdigest()})
+        categories[category] = variants
+
+    return {'format': MANIFEST_FORMAT, 'version': MANIFEST_FORMAT_VERSION, 'categories': categories}
+
+
+if __name__ == '__main__':
+    assetManifest = AssetManifest(buildManifest())
+    assetManifest.write()
+    print(f"Asset Manifest: {sum(len(variants) for variants in assetManifest.manifest['categories'].values())} assets")
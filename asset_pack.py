@@ -0,0 +1,201 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from asset_pyramid import AssetPyramid
+
+# File    : asset_pack.py
+# Classes : AssetPack
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Every asset in the AssetManifest, at every AssetPyramid grid size, decoded into one file of raw pixel
+#               blocks with an index at its start. The file is memory mapped read only, so opening it is one mmap
+#               call, and each asset is given out as a NumPy array or PIL Image over the mapped pixels without
+#               copying or decoding them. Several processes drawing at once share the same pages of memory.
+#
+#               It has the same load(path, gridSize) as AssetPyramid and can be used wherever one is. Every block
+#               is four bytes a pixel, straight (not premultiplied) RGBA as that is what PIL's paste blends with;
+#               the RGB floors (and any greyscale asset) are given an opaque alpha. PIL can only map an Image over
+#               a buffer in a few modes, RGBA being one and RGB not, so an RGB block would be copied on every load.
+#               The pack is made again when the manifest's assets change. Run it directly to build the pack up
+#               front: 'python asset_pack.py'.
+
+PACK_MAGIC = b'DUNGPACK'
+PACK_FORMAT_VERSION = 2
+# The magic, the length of the JSON index which follows it and where the blocks of pixels start. The offsets in the
+# index are from the start of the blocks.
+PACK_HEADER = struct.Struct('<8sQQ')
+# Each block of pixels starts on a multiple of this, so NumPy views over them are aligned.
+BLOCK_ALIGNMENT = 64
+
+# The number of bytes per pixel of each image mode kept in the pack.
+MODE_CHANNELS = {'RGBA': 4}
+
+
+class AssetPack:
+    def __init__(self, path=os.path.join('.asset_cache', 'assets.pack'), root='assets', fallback=None):
+        self.path = path
+        # An optional AssetPyramid to load any asset which is not in the pack from.
+        self.fallback = fallback
+
+        with open(path, 'rb') as packFile:
+            self.memory = mmap.mmap(packFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, indexLength, self.blocksStart = PACK_HEADER.unpack_from(self.memory, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"'{path}' is not a Dungeonify asset pack")
+        self.index = json.loads(bytes(self.memory[PACK_HEADER.size:PACK_HEADER.size + indexLength]).decode('utf-8'))
+        if self.index.get('version') != PACK_FORMAT_VERSION:
+            raise ValueError(f"'{path}' is an asset pack version this version of Dungeonify does not read")
+
+        self.levels = tuple(self.index['levels'])
+        self.sourceGridSize = self.index['sourceGridSize']
+
+        # (full path, level) --> the asset's entry in the index.
+        self.entries = {}
+        for entry in self.index['entries']:
+            fullPath = os.path.join(root, *entry['path'].split('/'))
+            self.entries[(packKey(fullPath), entry['level'])] = entry
+
+        self.hits = 0
+        self.misses = 0
+
+    # The pack for the manifest's assets, built (from the fallback pyramid's cache when given) if it is missing or
+    # was made from other assets.
+    @classmethod
+    def open(cls, assetManifest, path=os.path.join('.asset_cache', 'assets.pack'), fallback=None):
+        try:
+            assetPack = cls(path, assetManifest.root, fallback)
+            if assetPack.matches(assetManifest):
+                return assetPack
+            assetPack.close()
+        except (OSError, ValueError):
+            pass
+
+        buildPack(assetManifest, path, fallback)
+        return cls(path, assetManifest.root, fallback)
+
+    # True when the pack holds the manifest's assets, at the levels of the fallback pyramid when there is one.
+    def matches(self, assetManifest):
+        if self.fallback is not None and (self.levels != self.fallback.levels or
+                                          self.sourceGridSize != self.fallback.sourceGridSize):
+            return False
+        return self.index['assets'] == manifestHashes(assetManifest)
+
+    # The asset as a PIL Image drawn at gridSize pixels per grid square. At one of the levels the Image is over the
+    # mapped pixels themselves, and is read only.
+    def load(self, path, gridSize):
+        level = self.nearestLevel(gridSize)
+        entry = self.entries.get((packKey(path), level))
+        if entry is None:
+            self.misses += 1
+            if self.fallback is None:
+                raise FileNotFoundError(f"No asset Found in '{path}'")
+            return self.fallback.load(path, gridSize)
+
+        self.hits += 1
+        mode, size = entry['mode'], (entry['width'], entry['height'])
+        image = Image.frombuffer(mode, size, self.block(entry), 'raw', mode, 0, 1)
+
+        if level != gridSize:
+            image = image.resize(self.scaledSize(image.size, gridSize / level), Image.LANCZOS)
+        return image
+
+    def nearestLevel(self, gridSize):
+        return min(self.levels, key=lambda level: (abs(level - gridSize), -level))
+
+    def scaledSize(self, size, scale):
+        return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+    # The (height, width, channels) uint8 array of the asset at a level, a view over the mapped pixels.
+    def levelArray(self, path, level):
+        entry = self.entries[(packKey(path), level)]
+        return np.frombuffer(self.block(entry), dtype=np.uint8).reshape(
+            entry['height'], entry['width'], MODE_CHANNELS[entry['mode']])
+
+    def block(self, entry):
+        start = self.blocksStart + entry['offset']
+        return memoryview(self.memory)[start:start + entry['bytes']]
+
+    # The mapping can only be closed once no Image or array made from it is left.
+    def close(self):
+        self.entries = {}
+        try:
+            self.memory.close()
+        except BufferError:
+            pass
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def packKey(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+# The content hash of every asset in the manifest, by its path in the manifest.
+def manifestHashes(assetManifest):
+    return {variant['path']: variant['sha1']
+            for variants in assetManifest.manifest['categories'].values() for variant in variants}
+
+
+# Writes every asset in the manifest, at every level of the pyramid, to a new pack at path.
+def buildPack(assetManifest, path=os.path.join('.asset_cache', 'assets.pack'), assetPyramid=None):
+    if assetPyramid is None:
+        assetPyramid = AssetPyramid()
+
+    # Each asset once, however many categories list it.
+    assetPaths = sorted(manifestHashes(assetManifest))
+
+    entries = []
+    blocks = []
+    offset = 0
+    for assetPath in assetPaths:
+        for level in assetPyramid.levels:
+            array = assetPyramid.levelArray(assetManifest.resolve(assetPath), level)
+            if array.ndim == 2:
+                array = np.dstack((array, array, array))
+            if array.shape[2] == 3:
+                array = np.dstack((array, np.full(array.shape[:2], 255, dtype=np.uint8)))
+            height, width = array.shape[:2]
+            mode = 'RGBA'
+
+            entries.append({'path': assetPath, 'level': level, 'width': width, 'height': height, 'mode': mode,
+                            'offset': offset, 'bytes': array.nbytes})
+            blocks.append(np.ascontiguousarray(array, dtype=np.uint8))
+            offset += alignUp(array.nbytes)
+
+    index = {'format': 'dungeonify-assets-pack', 'version': PACK_FORMAT_VERSION, 'levels': list(assetPyramid.levels),
+             'sourceGridSize': assetPyramid.sourceGridSize, 'assets': manifestHashes(assetManifest), 'entries': entries}
+    indexBytes = json.dumps(index).encode('utf-8')
+    blocksStart = alignUp(PACK_HEADER.size + len(indexBytes))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first, so a reader never maps a half written pack.
+    handle, temporaryPath = tempfile.mkstemp(dir=directory)
+    with os.fdopen(handle, 'wb') as packFile:
+        packFile.write(PACK_HEADER.pack(PACK_MAGIC, len(indexBytes), blocksStart))
+        packFile.write(indexBytes)
+        for entry, block in zip(entries, blocks):
+            packFile.seek(blocksStart + entry['offset'])
+            packFile.write(block.tobytes())
+    os.replace(temporaryPath, path)
+
+
+def alignUp(length):
+    return -(-length // BLOCK_ALIGNMENT) * BLOCK_ALIGNMENT
+
+
+if __name__ == '__main__':
+    from asset_manifest import AssetManifest
+
+    assetManifest = AssetManifest.load()
+    buildPack(assetManifest)
+    assetPack = AssetPack()
+    print(f"Asset Pack: {len(assetPack.entries)} images, {len(assetPack.memory)} bytes")
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+# File    : asset_pyramid.py
+# Classes : AssetPyramid
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : A disk cache of the assets already decoded, and resampled to a few standard grid sizes (pixels per grid
+#               square). A render at any grid size loads the nearest size as a raw NumPy array, instead of decoding
+#               the original PNG or JPG and resampling it. Entries are keyed by a hash of the original file's
+#               contents, so an asset which changes is cached again. Run it directly to build the cache for every
+#               asset up front: 'python asset_pyramid.py'.
+
+# The grid sizes the assets are drawn at, i.e. a 200 x 200 pixel sprite fills one grid square.
+SOURCE_GRID_SIZE = 200
+# The grid sizes kept in the cache.
+PYRAMID_LEVELS = (50, 100, 200)
+
+
+class AssetPyramid:
+    def __init__(self, directory='.asset_cache', levels=PYRAMID_LEVELS, sourceGridSize=SOURCE_GRID_SIZE):
+        self.directory = directory
+        self.levels = tuple(sorted(levels))
+        self.sourceGridSize = sourceGridSize
+
+        # (path, size, modification time) --> contents hash, so a file is only hashed again once it changes.
+        self.hashes = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    # The asset as a PIL Image drawn at gridSize pixels per grid square. The nearest cached level is loaded, and
+    # only resized again when gridSize is not one of the levels.
+    def load(self, path, gridSize):
+        level = self.nearestLevel(gridSize)
+        image = Image.fromarray(self.levelArray(path, level))
+
+        if level != gridSize:
+            image = image.resize(self.scaledSize(image.size, gridSize / level), Image.LANCZOS)
+        return image
+
+    def nearestLevel(self, gridSize):
+        return min(self.levels, key=lambda level: (abs(level - gridSize), -level))
+
+    def scaledSize(self, size, scale):
+        return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+    # The (height, width, channels) uint8 array of the asset at a level, made and cached if needed.
+    def levelArray(self, path, level):
+        cachePath = self.path(self.fileHash(path), level)
+        try:
+            array = np.load(cachePath, allow_pickle=False)
+            self.hits += 1
+            return array
+        except (OSError, ValueError):
+            self.misses += 1
+
+        array = self.resample(path, level)
+        self.put(cachePath, array)
+        return array
+
+    def resample(self, path, level):
+        try:
+            image = Image.open(path)
+            image.load()
+        except OSError:
+            raise FileNotFoundError(f"No asset Found in '{path}'")
+
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+        if level != self.sourceGridSize:
+            image = image.resize(self.scaledSize(image.size, level / self.sourceGridSize), Image.LANCZOS)
+        return np.asarray(image)
+
+    def fileHash(self, path):
+        status = os.stat(path)
+        key = (os.path.abspath(path), status.st_size, status.st_mtime_ns)
+
+        fileHash = self.hashes.get(key)
+        if fileHash is None:
+            with open(path, 'rb') as assetFile:
+                fileHash = hashlib.sha1(assetFile.read()).hexdigest()
+            self.hashes[key] = fileHash
+        return fileHash
+
+    def path(self, fileHash, level):
+        return os.path.join(self.directory, f"{fileHash}-{level}.npy")
+
+    def put(self, cachePath, array):
+        # Write to a temporary file first, so a reader never sees a half written entry.
+        handle, temporaryPath = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as cacheFile:
+            np.save(cacheFile, array, allow_pickle=False)
+        os.replace(temporaryPath, cachePath)
+
+    # Caches every level of every asset under root.
+    def build(self, root='assets'):
+        for directory, _, fileNames in os.walk(root):
+            for fileName in sorted(fileNames):
+                if os.path.splitext(fileName)[1].lower() in ('.png', '.jpg', '.jpeg'):
+                    for level in self.levels:
+                        self.levelArray(os.path.join(directory, fileName), level)
+
+    def clear(self):
+        for fileName in os.listdir(self.directory):
+            if fileName.endswith('.npy'):
+                try:
+                    os.remove(os.path.join(self.directory, fileName))
+                except OSError:
+                    pass
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+if __name__ == '__main__':
+    assetPyramid = AssetPyramid()
+    assetPyramid.build()
+    print(f"Asset Pyramid: {assetPyramid.statistics()}")
@@ -0,0 +1,209 @@
+import ast
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from grid_quantisation import decimalNearest, snapNearest, snapNearestArray
+from osm_factory import indexNodesById, resolveWays, tagClassifier
+from osm_tiles import TiledOsmFetcher
+from tag_tables import isStructureCategory
+from rotation_test_cases import structureRotationTests
+
+# File    : benchmark.py
+# Classes : None
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Is used to time the core processing steps away from the GUI, on synthetic data of increasing size.
+#               Run it directly: 'python benchmark.py'.
+
+
+# Creates a grid of nodes, with one closed four node way per grid square. This is roughly the shape of the
+# data returned from the OSM API for a dense area of terraced houses.
+def syntheticSector(waysPerSide):
+    nodes_data = []
+    ways_data = []
+
+    nodesPerSide = waysPerSide + 1
+    for row in range(nodesPerSide):
+        for column in range(nodesPerSide):
+            nodes_data.append({'id': row * nodesPerSide + column,
+                               'lat': 52.6 + row * 0.00001, 'lon': 1.3 + column * 0.00001})
+
+    for row in range(waysPerSide):
+        for column in range(waysPerSide):
+            topLeft = row * nodesPerSide + column
+            bottomLeft = topLeft + nodesPerSide
+            ways_data.append({'id': len(ways_data), 'tag': {'building': 'yes'},
+                              'nd': [topLeft, topLeft + 1, bottomLeft + 1, bottomLeft, topLeft]})
+
+    return nodes_data, ways_data
+
+
+def benchmarkIngestion(sizes=(25, 50, 100, 200)):
+    print("--- Ingestion (node index + way resolution) ---")
+    for waysPerSide in sizes:
+        nodes_data, ways_data = syntheticSector(waysPerSide)
+        elementCount = len(nodes_data) + len(ways_data)
+
+        start = time.perf_counter()
+        nodesById = indexNodesById(nodes_data)
+        resolvedWays, unresolvedNodeRefs = resolveWays(ways_data, nodesById)
+        total = time.perf_counter() - start
+
+        # Linear scaling shows as a constant time per element.
+        print(f"elements: {elementCount:8d}  total: {total * 1000:9.3f} ms  per element: {total / elementCount * 1e6:6.3f} us")
+
+
+# The rotated footprints of a rotation test, as an (n, 2) array of every node.
+def rotationTestFootprints(text):
+    for structureRotationTest in structureRotationTests:
+        if structureRotationTest['text'] == text:
+            structures = ast.literal_eval(structureRotationTest['expected'])
+            return np.array([(node['x'], node['y']) for structure in structures for node in structure['nodes']])
+    raise Exception(f"Exception: no rotation test called {text}")
+
+
+def timeRepeated(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats, result
+
+
+def benchmarkGridQuantisation(tests=("'Large Structure Test'", "'Twenty Structures Test'"), steps=(8.0, 12.0, 16.0), repeats=50):
+    print("--- Grid quantisation (snap to the nearest grid square) ---")
+    for text in tests:
+        coordinates = rotationTestFootprints(text)
+        values = coordinates.ravel().tolist()
+
+        for step in steps:
+            decimalTime, decimalResult = timeRepeated(
+                lambda: [decimalNearest(value, step) for value in values], repeats)
+            scalarTime, scalarResult = timeRepeated(
+                lambda: [snapNearest(value, step) for value in values], repeats)
+            arrayTime, arrayResult = timeRepeated(
+                lambda: snapNearestArray(coordinates, step), repeats)
+
+            # The kernels must give exactly the Decimal results, including how ties are broken.
+            identical = decimalResult == scalarResult == arrayResult.ravel().tolist()
+
+            print(f"{text:28s} nodes: {len(coordinates):5d}  step: {step:4.0f}  decimal: {decimalTime * 1000:7.3f} ms  "
+                  f"scalar: {scalarTime * 1000:7.3f} ms  array: {arrayTime * 1000:7.3f} ms  identical: {identical}")
+
+
+# Creates a grid of small buildings over the area, plus one long building lying across the corner where four tiles
+# of tileSize meet, which every one of those tiles returns. Returns (nodes_data, ways_data, the long building's id).
+def syntheticTiledArea(min_lon, min_lat, buildingsPerSide, spacing, tileSize):
+    nodes_data = []
+    ways_data = []
+
+    def addBuilding(lonStart, latStart, lonEnd, latEnd):
+        firstId = len(nodes_data)
+        for lon, lat in ((lonStart, latStart), (lonEnd, latStart), (lonEnd, latEnd), (lonStart, latEnd)):
+            nodes_data.append({'id': len(nodes_data), 'lat': lat, 'lon': lon})
+        ways_data.append({'id': len(ways_data), 'tag': {'building': 'yes'},
+                          'nd': [firstId, firstId + 1, firstId + 2, firstId + 3, firstId]})
+        return ways_data[-1]['id']
+
+    for row in range(buildingsPerSide):
+        for column in range(buildingsPerSide):
+            lon = min_lon + spacing / 4 + column * spacing
+            lat = min_lat + spacing / 4 + row * spacing
+            addBuilding(lon, lat, lon + spacing / 2, lat + spacing / 2)
+
+    crossingWayId = addBuilding(min_lon + tileSize - spacing / 2, min_lat + tileSize - spacing / 2,
+                                min_lon + tileSize + spacing / 2, min_lat + tileSize + spacing / 2)
+    return nodes_data, ways_data, crossingWayId
+
+
+# Answers the OSM API's Map call from the synthetic area, like the real API: every node inside the bounding box,
+# every way using one of them, and all of those ways' nodes. Each request waits latency seconds first, as a stand
+# in for the round trip to the real server.
+class StandInOsmHandler(BaseHTTPRequestHandler):
+    nodes_data = []
+    ways_data = []
+    latency = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/api/0.6/map':
+            self.send_error(404)
+            return
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in parse_qs(url.query)['bbox'][0].split(','))
+        time.sleep(self.latency)
+
+        insideIds = {node['id'] for node in self.nodes_data
+                     if min_lon <= node['lon'] <= max_lon and min_lat <= node['lat'] <= max_lat}
+        ways = [way for way in self.ways_data if insideIds.intersection(way['nd'])]
+        nodeIds = insideIds.union(*(way['nd'] for way in ways))
+
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6">']
+        for node in self.nodes_data:
+            if node['id'] in nodeIds:
+                lines.append(f'<node id="{node["id"]}" lat="{node["lat"]:.7f}" lon="{node["lon"]:.7f}" version="1" '
+                             f'changeset="1" uid="1" user="benchmark" visible="true" timestamp="2022-05-18T00:00:00Z"/>')
+        for way in ways:
+            lines.append(f'<way id="{way["id"]}" version="1" changeset="1" uid="1" user="benchmark" visible="true" '
+                         f'timestamp="2022-05-18T00:00:00Z">')
+            lines.extend(f'<nd ref="{nodeId}"/>' for nodeId in way['nd'])
+            lines.extend(f'<tag k="{key}" v="{value}"/>' for key, value in way['tag'].items())
+            lines.append('</way>')
+        lines.append('</osm>')
+
+        body = '\n'.join(lines).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def benchmarkTiledFetch(workers=(1, 2, 4, 8), tilesPerSide=4, tileSize=0.001, buildingsPerSide=20, latency=0.05):
+    print("--- Tiled OSM fetch (local stand in server) ---")
+    min_lon, min_lat = 1.3, 52.6
+    max_lon, max_lat = min_lon + tilesPerSide * tileSize, min_lat + tilesPerSide * tileSize
+    nodes_data, ways_data, crossingWayId = syntheticTiledArea(
+        min_lon, min_lat, buildingsPerSide, tilesPerSide * tileSize / buildingsPerSide, tileSize)
+
+    handler = type('Handler', (StandInOsmHandler,), {
+                   'nodes_data': nodes_data, 'ways_data': ways_data, 'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        for workerCount in workers:
+            fetcher = TiledOsmFetcher(endpoint, workerCount, tileSize)
+            start = time.perf_counter()
+            sector = fetcher.map(min_lon, min_lat, max_lon, max_lat)
+            total = time.perf_counter() - start
+
+            # Every building comes out as exactly one structure with all of its nodes, including the one every
+            # tile around the corner returned.
+            wayElements = [element['data'] for element in sector if element['type'] == 'way']
+            structureIds = [way['id'] for way in wayElements if isStructureCategory(
+                tagClassifier.classify(way['tag']))]
+            resolvedWays, unresolvedNodeRefs = resolveWays(wayElements, indexNodesById(
+                [element['data'] for element in sector if element['type'] == 'node']))
+            assert structureIds.count(crossingWayId) == 1, "a way across a tile edge came out more than once"
+            assert sorted(structureIds) == [way['id'] for way in ways_data], "buildings were lost or repeated"
+            assert len(unresolvedNodeRefs) == 0, "a way's nodes were lost merging the tiles"
+
+            tileCount = tilesPerSide * tilesPerSide
+            print(f"workers: {workerCount:2d}  tiles: {tileCount:3d}  structures: {len(structureIds):5d}  "
+                  f"total: {total * 1000:8.1f} ms  tiles per second: {tileCount / total:7.1f}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    benchmarkIngestion()
+    benchmarkGridQuantisation()
+    benchmarkTiledFetch()
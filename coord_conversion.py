@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 EARTH_RADIUS = 6371  # Earth Radius in KM
 
@@ -36,6 +37,11 @@ class CoordConversion:
         self.p1 = ReferencePoint(p1_scrX, p1_scrY, p1_lat, p1_lng)
         self.p2 = ReferencePoint(p2_scrX, p2_scrY, p2_lat, p2_lng)
 
+        # The reference points never move, so their global positions (and the cos term shared by every
+        # projected point) are only calculated once.
+        self.cosAverageLatitude = math.cos((self.p1.lat + self.p2.lat)/2)
+        self.setPos()
+
     # def return_vals(self):
     #     x = 4
     #     y = 10
@@ -44,7 +50,7 @@ class CoordConversion:
     # This function converts lat and lng coordinates to GLOBAL X and Y positions
     def latlngToGlobalXY(self, lat, lng):
         # Calculates x based on cos of average of the latitudes
-        x = EARTH_RADIUS * lng * math.cos((self.p1.lat + self.p2.lat)/2)
+        x = EARTH_RADIUS * lng * self.cosAverageLatitude
         # Calculates y based on latitude
         y = EARTH_RADIUS * lat
         return {'x': x, 'y': y}
@@ -61,7 +67,6 @@ class CoordConversion:
         # Calculate global X and Y for projection point
         pos = self.latlngToGlobalXY(lat, lng)
 
-        self.setPos()
         # OLD
         # Calculate the percentage of Global X position in relation to total global width
         perX = ((pos['x']-self.p1.pos['x']) /
@@ -81,6 +86,25 @@ class CoordConversion:
             'y': self.p1.scrY + (self.p2.scrY - self.p1.scrY)*perY
         }
 
+    # The batch version of latlngToScreenXY. It converts arrays of lat and lng coordinates to arrays of SCREEN X
+    # and Y positions in one vectorised pass, giving exactly the same values as converting each point alone.
+    def latlngArrayToScreenXY(self, lats, lngs, xModifier):
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+
+        # Global X and Y for every projection point
+        globalX = EARTH_RADIUS * lngs * self.cosAverageLatitude
+        globalY = EARTH_RADIUS * lats
+
+        perX = ((globalX - self.p1.pos['x']) /
+                (self.p2.pos['x'] - self.p1.pos['x']))
+        perY = ((globalY - self.p1.pos['y']) /
+                (self.p2.pos['y'] - self.p1.pos['y']))
+
+        screenX = (self.p1.scrX + (self.p2.scrX - self.p1.scrX)*perX) * xModifier
+        screenY = self.p1.scrY + (self.p2.scrY - self.p1.scrY)*perY
+        return screenX, screenY
+
     @staticmethod
     def get_pi(arg):
         return arg + 3.14159286
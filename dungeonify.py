@@ -1,18 +1,17 @@
 from cmath import cos, sin
-import copy
-import glob
+import io
 from hashlib import new
 from itertools import chain
 import math
 from operator import attrgetter
 import random
+from collections import deque
 from re import A, X
 import sys
 from unittest import case
 import cairo
 from cv2 import INTER_MAX
 import numpy as np
-from decimal import Decimal
 
 from scipy import rand
 
@@ -20,6 +19,14 @@ from PIL import Image, ImageDraw
 
 # outputs to "dungeonified.png"
 from DungeonifyGenerators import GeneratorTypes
+from structure_buffer import StructureBuffer
+from grid_quantisation import snapNearest, snapDown, snapUp, snapNearestArray
+import orthogonalise
+from perimeter_index import PerimeterIndex
+from floor_texture import FloorTexture
+from sprite_atlas import SpriteAtlas
+from asset_manifest import AssetManifest
+from structure_metrics import structureMetrics, structureAreas, distanceCoefficients
 
 
 # File    : Dungeonify.py
@@ -30,13 +37,36 @@ from DungeonifyGenerators import GeneratorTypes
 #            
 
 
+# The attributes which make up a stage's output, saved after the stage is made and loaded back to show it.
+STAGE_ATTRIBUTES = ('structuresArray', 'newStructuresArray', 'zoomFactor', 'previousZoomFactor', 'pixelsPerGridSquare',
+                    'borderPixels', 'imageWidth', 'imageHeight', 'totalInchesWidth', 'totalInchesHeight', 'surface',
+                    'ctx', 'assetSize', 'imageWidthSquares', 'imageHeightSquares', 'new_image', 'structures',
+                    'vttStructures', 'images')
+
+
 class Dungeonify:
-    def __init__(self, structuresArray, roadsArray, inchesPerPixel, evaluateArea=False):
+    def __init__(self, structuresArray, roadsArray, inchesPerPixel, evaluateArea=False, orthogonaliseWorkers=None, saveImages=False, orthogonaliseCache=None, seed=None, assetPyramid=None, assetManifest=None):
         self.evaluateAreaFlag = evaluateArea
-
-        # remove the duplicate and unnessersary node
-        for structure in structuresArray:
-            structure['nodes'].pop(0)
+        # Processes used to orthogonalise large selections, None for every CPU and 1 to always stay in this process.
+        self.orthogonaliseWorkers = orthogonaliseWorkers
+        # An optional OrthogonaliseCache of each OSM way's orthogonalised structure.
+        self.orthogonaliseCache = orthogonaliseCache
+        # An optional AssetPyramid, or AssetPack, the battlemap's textures and sprites are loaded from.
+        self.assetPyramid = assetPyramid
+        # The AssetManifest listing every asset, loaded from assets/manifest.json when first drawing if not given.
+        self.assetManifest = assetManifest
+
+        # The structures may also be given in the compact array backed form.
+        if isinstance(structuresArray, StructureBuffer):
+            structuresArray = structuresArray.toStructures()
+
+        # The OSM way (id, version) of each structure, -1 when not known. Every stage keeps the structures in order.
+        self.structureWays = [(structure.get('id', -1), structure.get('version', -1))
+                              for structure in structuresArray]
+
+        # remove the duplicate and unnessersary node, from new lists so the caller's structures are left as they are.
+        structuresArray = [{'nodes': structure['nodes'][1:], 'speciality': structure['speciality']}
+                           for structure in structuresArray]
 
         self.structuresArray = structuresArray
         self.roadsArray = roadsArray
@@ -49,6 +79,47 @@ class Dungeonify:
         self.border = 2  # grid squares
         self.assetSize = 0
 
+        # The images of the loaded stage and the stages it was made from, by file name: cairo ImageSurfaces, apart
+        # from the dungeonified PIL Image. They are part of each stage's output, so loading a memoised stage brings
+        # back its own images. They are only also written to the working directory when saveImages is True.
+        self.images = {}
+        self.saveImages = saveImages
+
+        # Every random choice made dungeonifying a structure comes from its own generator, seeded from this and the
+        # structure, so the same seed and structures always give the same battlemap. None picks a seed at random.
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.random = self.structureRandom('map')
+
+        # Rooms are not split any smaller than this area (in grid squares), or into more rooms than this.
+        self.minRoomArea = 50
+        self.maxRooms = 32
+
+        # Each stage's output, memoised by stageKey. No stage changes its input's structures, so once made an output
+        # stays valid, and running a stage again (or running a later one) starts from it rather than from scratch.
+        self.stageOutputs = {}
+        self.initialOutput = self.stageOutput()
+
+    def outputImage(self, image, fileName):
+        self.images[fileName] = image
+        if self.saveImages:
+            self.writeImage(fileName, fileName)
+
+    # Writes a stage's image as a PNG, to a path or a file object.
+    def writeImage(self, fileName, file):
+        image = self.images[fileName]
+        if isinstance(image, Image.Image):
+            image.save(file, "PNG")
+        else:
+            image.write_to_png(file)
+
+    # A stage's image encoded as PNG, without touching the disk.
+    def imagePng(self, fileName):
+        pngFile = io.BytesIO()
+        self.writeImage(fileName, pngFile)
+        return pngFile.getvalue()
+
     def updateZoomFactor(self, newZoom):
         # calculates the new multiply factor
         if newZoom < self.previousZoomFactor:
@@ -58,51 +129,106 @@ class Dungeonify:
         self.previousZoomFactor = newZoom
 
     def calculateDistanceCoefficentBefore(self):
-        totalsList = []
-        for structure in self.structuresArray:
-            originNode = structure['nodes'][0]
-            total = 0
-            for node in structure['nodes']:
-                total += self.distanceBetweenNodes_xy(originNode, node)[0]
-            totalsList.append(total)
-        return totalsList
+        return distanceCoefficients(self.structuresArray, self.inchesPerPixel['horizontal'], self.inchesPerPixel['vertical']).tolist()
 
     def calculateDistanceCoefficentAfter(self):
-        totalsList = []
-        for structure in self.newStructuresArray:
-            originNode = structure['nodes'][0]
-            total = 0
-            for node in structure['nodes']:
-                total += self.distanceBetweenNodes_xy(originNode, node)[0]
-            totalsList.append(total)
-        return totalsList
+        return distanceCoefficients(self.newStructuresArray, self.inchesPerPixel['horizontal'], self.inchesPerPixel['vertical']).tolist()
 
-    def generateNewImage(self):
+    # Works out the geometry of the selected, rotated and repositioned stages exactly as generate does, but without
+    # drawing or writing any images, so the evaluations can be run over large selections. Returns the
+    # structureMetrics of the structures before and after.
+    def evaluateStages(self, zoomFactor=3.0):
+        before = structureMetrics(self.structuresArray, self.inchesPerPixel)
+
+        # Selected structures.
+        self.updateZoomFactor(zoomFactor)
+        self.updateImageProperties()
+
+        # Rotated structures, which are measured again once rotated.
+        self.updateZoomFactor(zoomFactor)
+        self.updateImageProperties()
+        self.rotateStructures()
+        self.updateImageProperties()
+
+        # Repositioned structures.
+        self.updateZoomFactor(zoomFactor)
+        self.updateImageProperties()
+        self.newStructuresArray = self.orthogonaliseSelection()
+
+        after = structureMetrics(self.newStructuresArray, self.inchesPerPixel)
+        return before, after
 
+    def updateImageProperties(self):
         if not self.evaluateAreaFlag:
             self.calculateImageProperties(updateNodes=True)
         else:
             # False for calulating change in area of structures. This will break the display.
             self.calculateImageProperties(updateNodes=False)
 
+    def generateNewImage(self):
+        self.updateImageProperties()
+
         self.surface = cairo.ImageSurface(
             cairo.FORMAT_ARGB32, int(self.imageWidth), int(self.imageHeight))
         self.ctx = cairo.Context(self.surface)
         # Rectangle(x0, y0, x1, y1)
         self.ctx.rectangle(0, 0, self.imageWidth, self.imageHeight)
 
+    # Makes the stage's output, from the previous stage's output at the same zoom, and loads it. The stages are
+    # memoised, so only the stages not already made with these arguments are run.
     def generate(self, generatorType, zoomFactor):
-        self.updateZoomFactor(zoomFactor)
-        self.generateNewImage()
+        key = self.stageKey(generatorType, zoomFactor)
+
+        if key not in self.stageOutputs:
+            if generatorType == GeneratorTypes.selectedBuildings:
+                self.loadStageOutput(self.initialOutput)
+            else:
+                self.generate(GeneratorTypes(
+                    generatorType.value - 1), zoomFactor)
+
+            # The previous stages' images are kept, but this stage's go in a dict of its own.
+            self.images = dict(self.images)
+
+            self.updateZoomFactor(zoomFactor)
+            self.generateNewImage()
+
+            switchOptions = {
+                GeneratorTypes.selectedBuildings: self.drawSelectedStructures,
+                GeneratorTypes.rotatedBuildings: self.drawRotatedStructures,
+                GeneratorTypes.repositionedBuildings: self.redrawForDegreesStructures,
+                GeneratorTypes.dungeonifiedBuildings: self.drawForDungeonified,
+            }
 
-        switchOptions = {
-            GeneratorTypes.selectedBuildings: self.drawSelectedStructures,
-            GeneratorTypes.rotatedBuildings: self.drawRotatedStructures,
-            GeneratorTypes.repositionedBuildings: self.redrawForDegreesStructures,
-            GeneratorTypes.dungeonifiedBuildings: self.drawForDungeonified,
-        }
+            a = switchOptions[generatorType]()
 
-        a = switchOptions[generatorType]()
+            self.stageOutputs[key] = self.stageOutput()
+
+        self.loadStageOutput(self.stageOutputs[key])
+
+    # Everything a stage's output depends on: the stage, the zoom and any settings only that stage uses. Changing
+    # one of those settings only runs that stage again.
+    def stageKey(self, generatorType, zoomFactor):
+        if generatorType == GeneratorTypes.dungeonifiedBuildings:
+            return (generatorType, zoomFactor, self.minRoomArea, self.maxRooms, self.seed)
+        return (generatorType, zoomFactor)
+
+    # A random number generator of its own for a structure (or anything else drawn, such as the 'map'). A structure
+    # from an OSM way is known by the way, so it looks the same whatever else is selected, otherwise by its index.
+    def structureRandom(self, structureKey):
+        return random.Random(f"{self.seed}:{structureKey}")
+
+    def structureKey(self, structureIndex):
+        wayId, wayVersion = self.structureWays[structureIndex]
+        if wayId < 0:
+            return f"structure {structureIndex}"
+        return f"way {wayId} version {wayVersion}"
+
+    def stageOutput(self):
+        return {attribute: getattr(self, attribute, None) for attribute in STAGE_ATTRIBUTES}
+
+    def loadStageOutput(self, stageOutput):
+        for attribute, value in stageOutput.items():
+            setattr(self, attribute, value)
 
     # TODO: think about instead just creating both image and image+grid on this one pass, then load each based on checkbox.
     def generate_grid(self, width=0, height=0):
@@ -141,7 +267,7 @@ class Dungeonify:
             ctx.line_to(width,    i / inchesPerPixel_Y)
         ctx.stroke()
 
-        surface.write_to_png("grid.png")
+        self.outputImage(surface, "grid.png")
 
     def calculateImageProperties(self, updateNodes=False):
         offsetMultiplier = 0.0
@@ -190,10 +316,10 @@ class Dungeonify:
             self.imageHeight
 
         if updateNodes:
-            for structure in self.structuresArray:
-                for node in structure['nodes']:
-                    node['x'] = (node['x'] - minX) * self.zoomFactor
-                    node['y'] = (node['y'] - minY) * self.zoomFactor
+            # New nodes, as the old ones belong to the previous stage's output.
+            self.structuresArray = [dict(structure, nodes=[{'x': (node['x'] - minX) * self.zoomFactor, 'y': (node['y'] - minY) * self.zoomFactor}
+                                                           for node in structure['nodes']])
+                                    for structure in self.structuresArray]
 
     def drawSelectedStructures(self, fileName="basic.png"):
         pat = cairo.SolidPattern(1, 1, 1, 1)
@@ -218,7 +344,7 @@ class Dungeonify:
             self.ctx.set_line_width(2 / self.imageWidth)
             self.ctx.stroke()
 
-        self.surface.write_to_png(fileName)  # Output to PNG
+        self.outputImage(self.surface, fileName)
 
     def calculateStructureCentroid(self, nodes):
         xCoordinates = [vertex['x'] for vertex in nodes]
@@ -227,175 +353,51 @@ class Dungeonify:
         y = sum(yCoordinates) / len(nodes)
         return {'x': x, 'y': y}
 
-    def drawRotatedStructures(self):
-        pat = cairo.SolidPattern(1, 1, 1, 1)
-        self.ctx.set_source(pat)
-        self.ctx.fill()
-
-        # rotate all nodes
-        rotatedNode = {'x': -1, 'y': -1}
-
-        for structure in self.structuresArray:
-
-            originNode = self.calculateStructureCentroid(
-                structure['nodes'])
-
-            # Calculate which node pair is the longest distance, so that we can base the rotation angle on it.
-            structureAngle = self.angleOfLongestDistanceBetweenNodes(
-                structure['nodes'])
-
-            for index in range(len(structure['nodes'])):
-                currentNode = structure['nodes'][index]
-
-                # rotatedNode = self.rotate_point(currentNode, angle, (firstNode['x'], firstNode['y']))
-                rotatedNode = self.rotateNode(
-                    originNode, currentNode, structureAngle)
-
-                self.ctx.line_to(
-                    rotatedNode['x'] + self.borderPixels, rotatedNode['y'] + self.borderPixels)
-
-                structure['nodes'][index] = rotatedNode
-
-            self.ctx.move_to(0, 0)
-            self.ctx.close_path()
-
-            colourHexOutline = '0000FF'
-            r = int(colourHexOutline[0:2], 16) / 256
-            g = int(colourHexOutline[2:4], 16) / 256
-            b = int(colourHexOutline[4:6], 16) / 256
+    # The angle, in degrees, of each structure's longest edge from the horizontal or vertical (whichever is
+    # nearer). The same as angleOfLongestDistanceBetweenNodes, for every structure at once: the longest edges are
+    # found over the whole buffer, then each structure's angle is taken with angleForTwoNodes itself.
+    def longestEdgeAngles(self, structureBuffer):
+        longestEdges = structureBuffer.longestEdges(
+            self.inchesPerPixel['horizontal'], self.inchesPerPixel['vertical'])
+        coordinates = structureBuffer.coordinates.tolist()
+
+        angles = np.zeros(len(structureBuffer))
+        for structureIndex, edge in enumerate(longestEdges.tolist()):
+            if edge >= 0:
+                (x1, y1), (x2, y2) = coordinates[edge], coordinates[edge + 1]
+                angles[structureIndex] = self.angleForTwoNodes(
+                    {'x': x1, 'y': y1}, {'x': x2, 'y': y2})
+        return angles
+
+    # Rotate every structure at once, about its centroid, by the angle which lines its longest edge up with the
+    # horizontal or vertical.
+    def rotateStructures(self):
+        structureBuffer = StructureBuffer.fromStructures(self.structuresArray)
+        originNodes = structureBuffer.centroids()
+        structureAngles = self.longestEdgeAngles(structureBuffer)
+        rotatedBuffer = structureBuffer.rotated(originNodes, structureAngles)
+
+        self.structuresArray = [dict(structure, nodes=rotatedBuffer.structure(structureIndex)['nodes'])
+                                for structureIndex, structure in enumerate(self.structuresArray)]
 
-            self.ctx.set_source_rgb(r, g, b)  # Solid color
-            self.ctx.fill()
-            self.ctx.set_line_width(2 / self.imageWidth)
-            self.ctx.stroke()
+    def drawRotatedStructures(self):
+        self.rotateStructures()
 
+        # Rotating can move structures past the edges measured before, so the image is measured again first.
         self.generateNewImage()
         self.drawSelectedStructures("rotated.png")
 
     def rotateAllNodes(self, structure):
-        inchCorrectedNode = {'x': 0, 'y': 0}
-
-        newStructure = {'nodes': [],
-                        'speciality': structure['speciality']}
-
-        currentNode = structure['nodes'][0]
-
-        inchCorrectedNode['x'] = self.roundToNearestInch(
-            currentNode['x'])
-        inchCorrectedNode['y'] = self.roundToNearestInch(
-            currentNode['y'])
-
-        newStructure['nodes'].append(inchCorrectedNode)
-        # still -2 as we just added two extras to the end
-        for index in range(len(structure['nodes']) - 1):
-            nextNode = structure['nodes'][index + 1]
-            # nextNextNode = newStructure['nodes'][index + 2]
-            # Round nextNode nearest inch here too?
-            # angle = self.angleForTwoNodes2(currentNode, nextNode, nextNextNode)
-            #angle = self.angleForTwoNodes3(currentNode, nextNode)
-            angle = self.angleForTwoNodes(currentNode, nextNode)
-            # northNode = {'x': currentNode['x'], 'y': currentNode['y'] - 1}
-            # angle1 = self.angleForThreeNodes(northNode, currentNode, nextNode)
-            # angle between the vector and the horizontal or vertical - whichever is longer.
-            # angle = self.angleForTwoNodes(nextNode, currentNode)
-
-            # TODO: make the round to nearest inch calc occur within rotating the node as this may fix the error with diagonal nodes.
-            rotatedNode = self.rotateNode(currentNode, nextNode, angle)
-            inchCorrectedNode = {'x': 0, 'y': 0}
-            inchCorrectedNode['x'] = self.roundToNearestInch(
-                rotatedNode['x'])
-            inchCorrectedNode['y'] = self.roundToNearestInch(
-                rotatedNode['y'])
-            # self.ctx.line_to(rotatedNode['x'] + self.borderPixels, rotatedNode['y'] + self.borderPixels)
-            newStructure['nodes'].append(inchCorrectedNode)
-            currentNode = inchCorrectedNode
-
-        return newStructure
+        return orthogonalise.rotateAllNodes(structure, self.pixelsPerGridSquare)
 
     def removeDuplicateNodes(self, structure):
-        newStructure = {'nodes': [],
-                        'speciality': structure['speciality']}
-
-        for nodeIndex in range(len(structure['nodes']) - 1):
-            if structure['nodes'][nodeIndex] != structure['nodes'][nodeIndex + 1]:
-                newStructure['nodes'].append(structure['nodes'][nodeIndex])
-
-        if structure['nodes'][len(structure['nodes']) - 1] != structure['nodes'][0]:
-            newStructure['nodes'].append(
-                structure['nodes'][len(structure['nodes']) - 1])
-
-        return newStructure
+        return orthogonalise.removeDuplicateNodes(structure)
 
     def simplifyNodes(self, structure):
-        tempStructure = self.removeDuplicateNodes(structure)
-
-        newStructure = {'nodes': [],
-                        'speciality': tempStructure['speciality']}
-        newStructure = copy.deepcopy(tempStructure)
-
-        # Remove the center node of a collection of three, if the middle node is exactly horizontally or vertically between them.
-        # i.e. it adds no value.
-
-        for index in range(0, len(tempStructure['nodes']) - 2):
-            currentNode = tempStructure['nodes'][index]
-            nextNode = tempStructure['nodes'][index + 1]
-            nextNextNode = tempStructure['nodes'][index + 2]
-
-            if (currentNode['x'] == nextNode['x'] == nextNextNode['x']) or \
-                    (currentNode['y'] == nextNode['y'] == nextNextNode['y']):
-                newStructure['nodes'].remove(nextNode)
-
-        # if (tempStructure['nodes'][index]['x'] == tempStructure['nodes'][index + 1]['x'] == tempStructure['nodes'][index + 2]['x']) or \
-        #         (tempStructure['nodes'][index]['y'] == tempStructure['nodes'][index + 1]['y'] == tempStructure['nodes'][index + 2]['y']):
-        #     newStructure['nodes'].remove(tempStructure['nodes'][index + 1])
-
-        # if (tempStructure['nodes'][index + 1]['x'] == tempStructure['nodes'][index + 2]['x'] == tempStructure['nodes'][0]['x']) or \
-        #         (tempStructure['nodes'][index + 1]['y'] == tempStructure['nodes'][index + 2]['y'] == tempStructure['nodes'][0]['y']):
-        #     newStructure['nodes'].remove(tempStructure['nodes'][index + 2])
-
-        tempStructure['nodes'].append(tempStructure['nodes'][0])
-        tempStructure['nodes'].append(tempStructure['nodes'][1])
-        tempStructure['nodes'].append(tempStructure['nodes'][2])
-
-        return newStructure
+        return orthogonalise.simplifyNodes(structure)
 
     def fillNodeGaps(self, structure):
-        newStructure = {'nodes': [],
-                        'speciality': structure['speciality']}
-        #fill in gaps
-
-        # structure['nodes'].append(structure['nodes'][0])
-        for index in range(0, len(structure['nodes']) - 1):
-            currentNode = structure['nodes'][index]
-            nextNode = structure['nodes'][index + 1]
-
-            if currentNode['x'] != nextNode['x'] and currentNode['y'] != nextNode['y']:
-                newNode = currentNode
-                newNode['y'] = nextNode['y']
-                newStructure['nodes'].append(newNode)
-            newStructure['nodes'].append(currentNode)
-
-        # newStructure['nodes'].append(
-        #     structure['nodes'][len(structure['nodes']) - 1])
-
-        if structure['nodes'][len(structure['nodes']) - 1]['x'] != structure['nodes'][0]['x'] \
-                and structure['nodes'][len(structure['nodes']) - 1]['y'] != structure['nodes'][0]['y']:
-
-            if structure['nodes'][len(structure['nodes']) - 3]['x'] == structure['nodes'][len(structure['nodes']) - 2]['x']:
-                newNode = structure['nodes'][len(structure['nodes']) - 1]
-                newNode['x'] = structure['nodes'][0]['x']
-                newStructure['nodes'].append(newNode)
-            elif structure['nodes'][len(structure['nodes']) - 3]['y'] == structure['nodes'][len(structure['nodes']) - 2]['y']:
-                newNode = structure['nodes'][len(structure['nodes']) - 1]
-                newNode['y'] = structure['nodes'][0]['y']
-                newStructure['nodes'].append(newNode)
-        else:
-            newStructure['nodes'].append(
-                structure['nodes'][len(structure['nodes']) - 1])
-
-        # newStructure['nodes'].append(newStructure['nodes'][0])
-
-        return newStructure
+        return orthogonalise.fillNodeGaps(structure)
 
     def fixIncorrectRounding(self, structure):
         # newStructure = {'nodes': [],
@@ -443,71 +445,36 @@ class Dungeonify:
         newStructure = {'nodes': [],
                         'speciality': structure['speciality']}
 
-        for node in structure['nodes']:
-            newNode = {'x': 0, 'y': 0}
-            newNode['x'] = self.roundToNearestInch(
-                node['x'])
-            newNode['y'] = self.roundToNearestInch(
-                node['y'])
-
-            newStructure['nodes'].append(newNode)
+        # Snap every node at once.
+        coordinates = snapNearestArray([(node['x'], node['y']) for node in structure['nodes']],
+                                       self.pixelsPerGridSquare)
+        newStructure['nodes'] = [{'x': x, 'y': y}
+                                 for x, y in coordinates.tolist()]
 
         return newStructure
 
     def fixNegativeNodes(self, structure):
-        minX = min(structure['nodes'], key=lambda x: x['x'])[
-            'x']
-        minY = min(structure['nodes'], key=lambda x: x['y'])[
-            'y']
+        return orthogonalise.fixNegativeNodes(structure)
 
-        if minX < 0:
-            for node in structure['nodes']:
-                node['x'] += abs(minX)
-        if minY < 0:
-            for node in structure['nodes']:
-                node['y'] += abs(minY)
+    # Every structure's orthogonalised structure, taken from the cache where it has already been worked out.
+    def orthogonaliseSelection(self):
+        if self.orthogonaliseCache is None:
+            return orthogonalise.orthogonaliseStructures(
+                self.structuresArray, self.pixelsPerGridSquare, self.orthogonaliseWorkers)
 
-        return structure
+        return self.orthogonaliseCache.orthogonaliseStructures(
+            self.structuresArray, self.structureWays, self.pixelsPerGridSquare, self.orthogonaliseWorkers)
 
     def redrawForDegreesStructures(self):
         pat = cairo.SolidPattern(1, 1, 1, 1)
         self.ctx.set_source(pat)
         self.ctx.fill()
 
-        # rotate odd angles
-        rotatedNode = {'x': -1, 'y': -1}
-        originNode = {'x': 0, 'y': 0}
-
-        for structure in self.structuresArray:
-            tempStructure = structure
-
-            # currentStructure = self.roundNodesToNearestInch(tempStructure)
-            # tempStructure = currentStructure
-
-            # currentStructure = self.orderNodesToLongest(tempStructure)
-            # tempStructure = currentStructure
-
-            currentStructure = self.removeDuplicateNodes(structure)
-            tempStructure = currentStructure
-
-            currentStructure = self.rotateAllNodes(tempStructure)
-            tempStructure = currentStructure
-
-            currentStructure = self.simplifyNodes(tempStructure)
-            tempStructure = currentStructure
-
-            currentStructure = self.fixNegativeNodes(tempStructure)
-            tempStructure = currentStructure
-
-            currentStructure = self.fillNodeGaps(tempStructure)
-            tempStructure = currentStructure
-
-            # currentStructure = self.fixIncorrectRounding(tempStructure)
-            # tempStructure = currentStructure
-
-            # Make the structure a node cycle
-            currentStructure['nodes'].append(currentStructure['nodes'][0])
+        # The geometry of every structure is worked out first, on several processes for large selections, then drawn.
+        orthogonalisedStructures = self.orthogonaliseSelection()
+        self.newStructuresArray = []
 
+        for currentStructure in orthogonalisedStructures:
             b = 0
             for index in range(len(currentStructure['nodes']) - 1):
                 currentNode = currentStructure['nodes'][index]
@@ -530,8 +497,7 @@ class Dungeonify:
             self.ctx.set_line_width(2 / self.imageWidth)
             self.ctx.stroke()
 
-        self.surface.write_to_png("AnglesRule.png")  # Output to PNG
-        # self.surface.write_to_png("dungeonify.png")  # Output to PNG
+        self.outputImage(self.surface, "AnglesRule.png")
 
     def create_blank(self, width, height, rgb_color=(0, 0, 0)):
         """Create new image(numpy array) filled with certain color in RGB"""
@@ -545,121 +511,83 @@ class Dungeonify:
 
         return image
 
-    def loadAWallAsset(self, url, needRotate=True):
-        try:
-            asset = Image.open(url)
-        except:
-            raise FileNotFoundError(f"No asset Found in '{url}'")
-
-        asset.resize((int(self.pixelsPerGridSquare),
-                     int(self.pixelsPerGridSquare)))
+    # Loads every wall, door, window, sill and pillar sprite into an atlas at the grid square size.
+    def loadSpriteAtlas(self):
+        spriteAtlas = SpriteAtlas(self.pixelsPerGridSquare, self.assetPyramid)
+        manifest = self.loadAssetManifest()
+
+        spriteAtlas.addCategory('pillars', manifest.paths('pillars'))
+        spriteAtlas.addCategory(
+            'specialityPillars', manifest.paths('specialityPillars'))
+
+        # Wall sprites are drawn running vertically, doors, windows and sills running horizontally.
+        spriteAtlas.addCategory(
+            'exteriorWalls', manifest.paths('exteriorWalls'), drawnVertically=True)
+        spriteAtlas.addCategory(
+            'interiorWalls', manifest.paths('interiorWalls'), drawnVertically=True)
+        spriteAtlas.addCategory(
+            'doors', manifest.paths('doors'), drawnVertically=False)
+        spriteAtlas.addCategory(
+            'windows', manifest.paths('windows'), drawnVertically=False)
+        spriteAtlas.addCategory(
+            'sills', manifest.paths('sills'), drawnVertically=False)
+
+        spriteAtlas.addCategory(
+            'specialityWalls', manifest.paths('specialityWalls'), drawnVertically=True)
+        spriteAtlas.addCategory(
+            'specialityDoors', manifest.paths('specialityDoors'), drawnVertically=False)
+        spriteAtlas.addCategory(
+            'specialitySills', manifest.paths('specialitySills'), drawnVertically=False)
+        spriteAtlas.addCategory(
+            'specialityWindows', manifest.paths('specialityWindows'), drawnVertically=False)
+
+        return spriteAtlas
 
-        if not needRotate:
-            return asset
-        else:
-            return asset.rotate(90.0)
-
-    def loadWallAssets(self, path):
-        assetList = []
-        for filename in glob.glob(path):  # assuming gif
-            asset = Image.open(filename)
-            asset.resize((int(self.pixelsPerGridSquare),
-                         int(self.pixelsPerGridSquare)))
-
-            assetList.append(asset)
-
-        if len(assetList) == 0:
-            raise FileNotFoundError(f"No assets Found in '{path}'")
+    def loadAFloorAsset(self, url):
+        return FloorTexture(url, self.assetPyramid, int(self.pixelsPerGridSquare)).canvas(int(self.imageWidthSquares * int(self.pixelsPerGridSquare)),
+                                        int(self.imageHeightSquares * int(self.pixelsPerGridSquare)))
 
-        return assetList
+    # The textures of a manifest category. They are only read from disk, and tiled, once drawForDungeonified picks
+    # them.
+    def loadFloorAssets(self, category):
+        return [FloorTexture(filename, self.assetPyramid, int(self.pixelsPerGridSquare))
+                for filename in self.loadAssetManifest().paths(category)]
 
-    def loadAFloorAsset(self, url):
-        try:
-            floor = Image.open(url)
-        except:
-            raise FileNotFoundError(f"No asset Found in '{url}'")
-
-        # pillar.resize((pixelsPerGridSquareInt,pixelsPerGridSquareInt))
-
-        # The width and height of the background tile
-        floorWidth, floorHeight = floor.size
-
-        # Creates a new empty image, RGB mode, and size 1000 by 1000
-        floorImage = Image.new('RGB', (int(self.imageWidthSquares * int(self.pixelsPerGridSquare)),
-                               int(self.imageHeightSquares * int(self.pixelsPerGridSquare))))
-
-        # The width and height of the new image
-        w, h = floorImage.size
-
-        # Iterate through a grid, to place the background tile
-        for i in range(0, w, floorWidth):
-            for j in range(0, h, floorHeight):
-                # Change brightness of the images, just to emphasise they are unique copies
-                # floor_grass = Image.eval(floor_grass, lambda x: x+(i+j)/1000)
-
-                # paste the image at location i, j:
-                floorImage.paste(floor, (i, j))
-
-        # floorImage.show()
-        return floorImage
-
-    def loadFloorAssets(self, path):
-        assetList = []
-        for filename in glob.glob(path):  # assuming gif
-            floor = Image.open(filename)
-            # pillar.resize((pixelsPerGridSquareInt,pixelsPerGridSquareInt))
-            # The width and height of the background tile
-            floorWidth, floorHeight = floor.size
-            # Creates a new empty image, RGB mode, and size 1000 by 1000
-            floorImage = Image.new('RGB', (int(self.imageWidthSquares * int(
-                self.pixelsPerGridSquare)), int(self.imageHeightSquares * int(self.pixelsPerGridSquare))))
-            # The width and height of the new image
-            w, h = floorImage.size
-            # Iterate through a grid, to place the background tile
-            for i in range(0, w, floorWidth):
-                for j in range(0, h, floorHeight):
-                    # Change brightness of the images, just to emphasise they are unique copies
-                    # floor_grass = Image.eval(floor_grass, lambda x: x+(i+j)/1000)
-                    # paste the image at location i, j:
-                    floorImage.paste(floor, (i, j))
-            # floorImage.show()
-            assetList.append(floorImage)
-
-        if len(assetList) == 0:
-            raise FileNotFoundError(f"No assets Found in {path}")
-        return assetList
+    # The manifest is only read once, however many battlemaps are drawn.
+    def loadAssetManifest(self):
+        if self.assetManifest is None:
+            self.assetManifest = AssetManifest.load()
+        return self.assetManifest
 
     def generateAssetsBetweenNodes(self, orientation, addDoor, enableWindows, internalWallNodeIndex, currentNode, nextNode, iterator):
         if orientation == 'horizontal':
             start = currentNode['x']
             end = nextNode['x']
             alternate = currentNode['y']
-
-            wallAsset = self.currentStructureAssets['wall'].rotate(90.0)
-            doorAsset = self.currentStructureAssets['door']
-            if enableWindows:
-                windowAsset = self.currentStructureAssets['window']
-                sillAsset = self.currentStructureAssets['sill']
         else:
             start = currentNode['y']
             end = nextNode['y']
             alternate = currentNode['x']
 
-            wallAsset = self.currentStructureAssets['wall']
-            doorAsset = self.currentStructureAssets['door'].rotate(90.0)
-            if enableWindows:
-                windowAsset = self.currentStructureAssets['window'].rotate(
-                    90.0)
-                sillAsset = self.currentStructureAssets['sill'].rotate(90.0)
+        # The sprites already turned for this orientation, each an (image, mask) pair.
+        wallAsset, wallMask = self.spriteAtlas.sprite(
+            *self.currentStructureAssets['wall'], orientation)
+        doorAsset, doorMask = self.spriteAtlas.sprite(
+            *self.currentStructureAssets['door'], orientation)
+        if enableWindows:
+            windowAsset, windowMask = self.spriteAtlas.sprite(
+                *self.currentStructureAssets['window'], orientation)
+            sillAsset, sillMask = self.spriteAtlas.sprite(
+                *self.currentStructureAssets['sill'], orientation)
 
         doorPosition = -1
         if addDoor:
             # ???
             if abs(start) < abs(end):
-                doorPosition = random.randint(
+                doorPosition = self.random.randint(
                     start + iterator, end - 2 * iterator)
             else:
-                doorPosition = random.randint(
+                doorPosition = self.random.randint(
                     end - iterator, start + 2 * iterator) + 1  # Fixed Bug
 
         constantCoordinate = (
@@ -690,7 +618,7 @@ class Dungeonify:
 
             if i != start and i != end - iterator:
                 # not ends of wall, so can put door or window instead
-                rand = random.randint(0, 6)
+                rand = self.random.randint(0, 6)
 
                 # #testing
                 # if internalWallNodeIndex != None:
@@ -704,7 +632,7 @@ class Dungeonify:
                         (currentPoint[1] - decreaseOffsetY) / self.assetSize)}, 'type': 'Door'}
                     self.vttStructure.append(currentVTTPoint)
                     self.new_image.paste(
-                        doorAsset, currentPoint, mask=doorAsset)
+                        doorAsset, currentPoint, mask=doorMask)
                     # only one door.
                     lastGenerated = 'Door'
                 elif (rand <= 1 and enableWindows) and (i not in [doorPosition, doorPosition - 1, doorPosition + 1]):
@@ -718,9 +646,9 @@ class Dungeonify:
                             (currentPoint[1] - decreaseOffsetY) / self.assetSize)}, 'type': 'Window'}
                         self.vttStructure.append(currentVTTPoint)
                     self.new_image.paste(
-                        sillAsset, currentPoint, mask=sillAsset)
+                        sillAsset, currentPoint, mask=sillMask)
                     self.new_image.paste(
-                        windowAsset, currentPoint, mask=windowAsset)
+                        windowAsset, currentPoint, mask=windowMask)
                     # if next node is in the same direction as this one was then remove current node from list.
 
                     lastGenerated = 'Window'
@@ -735,7 +663,7 @@ class Dungeonify:
                         self.vttStructure.append(currentVTTPoint)
 
                     self.new_image.paste(
-                        wallAsset, currentPoint, mask=wallAsset)
+                        wallAsset, currentPoint, mask=wallMask)
 
                     lastGenerated = 'Wall'
             else:
@@ -748,7 +676,7 @@ class Dungeonify:
                             (currentPoint[1] - decreaseOffsetY) / self.assetSize)}, 'type': 'Wall'}
 
                     self.vttStructure.append(currentVTTPoint)
-                self.new_image.paste(wallAsset, currentPoint, mask=wallAsset)
+                self.new_image.paste(wallAsset, currentPoint, mask=wallMask)
 
                 lastGenerated = 'Wall'
 
@@ -770,18 +698,10 @@ class Dungeonify:
     #     return totalDistance
 
     def calculateStructureAreasBefore(self):
-        structuresAreaArray = []
-        for structure in self.structuresArray:
-            area = self.calcPolygonArea(structure['nodes'])
-            structuresAreaArray.append(area)
-        return structuresAreaArray
+        return structureAreas(self.structuresArray).tolist()
 
     def calculateStructureAreasAfter(self):
-        structuresAreaArray = []
-        for structure in self.newStructuresArray:
-            area = self.calcPolygonArea(structure['nodes'])
-            structuresAreaArray.append(area)
-        return structuresAreaArray
+        return structureAreas(self.newStructuresArray).tolist()
 
     def polyArea(self, structureNodesArray):  # xCoordinates,yCoordinates
         xValues = np.array([p[0] for p in structureNodesArray])
@@ -804,36 +724,7 @@ class Dungeonify:
         return self.polyArea(structureNodesArray)
 
     def findWallWhichContainsNode(self, structureNodes, searchNode):
-        for nodeIndex in range(len(structureNodes) - 1):
-            currentNode = structureNodes[nodeIndex]
-            nextNode = structureNodes[nodeIndex + 1]
-
-            xDifferent = nextNode['x'] - currentNode['x']
-            yDifferent = nextNode['y'] - currentNode['y']
-
-            if xDifferent != 0:
-                #change in x
-                iterator = int(math.copysign(1, xDifferent))
-
-                start = currentNode['x']
-                end = nextNode['x']
-                constantCoordinate = currentNode['y']
-
-                for varyingCoordinate in range(start, end, +iterator):
-                    if {'x': varyingCoordinate, 'y': constantCoordinate} == searchNode:
-                        return currentNode, nextNode
-
-            elif yDifferent != 0:
-                #change in y
-                iterator = int(math.copysign(1, yDifferent))
-
-                start = currentNode['y']
-                end = nextNode['y']
-                constantCoordinate = currentNode['x']
-
-                for varyingCoordinate in range(start, end, +iterator):
-                    if {'x': constantCoordinate, 'y': varyingCoordinate} == searchNode:
-                        return currentNode, nextNode
+        return PerimeterIndex(structureNodes).wallContaining(searchNode)
 
     def nodesBetweenTwoNodes(self, orientation, currentNode, nextNode, iterator):
         nodes = []
@@ -932,71 +823,19 @@ class Dungeonify:
             structures.append(reorderedStructure)
         return structures
 
-    def determineRooms(self, version, structureNodes, newWallStart, newWallEnd, nodes):
-        room1 = []
-        room2 = []
-
-        if version == 1:
-            a = structureNodes.index(nodes[0])
-            b = structureNodes.index(nodes[1])
-            c = structureNodes.index(nodes[2])
-            d = structureNodes.index(nodes[3])
-        else:
-            c = structureNodes.index(nodes[0])
-            d = structureNodes.index(nodes[1])
-            a = structureNodes.index(nodes[2])
-            b = structureNodes.index(nodes[3])
-
-        # Calc node 1
-        if a < b:
-            room1.extend(structureNodes[0:a + 1])
-        else:
-            room1.extend(structureNodes[0:b + 1])
-
-        # whichever below is closest to node1
-        if self.manhattenDistance(newWallStart, nodes[0]) < self.manhattenDistance(newWallEnd, nodes[0]):
-            room1.append(newWallStart)
-            room1.append(newWallEnd)
-        else:
-            room1.append(newWallEnd)
-            room1.append(newWallStart)
-
-        if c < d:
-            room1.extend(structureNodes[c + 1:len(structureNodes)])
-        else:
-            room1.extend(structureNodes[d + 1:len(structureNodes)])
-
-        # Calc Room 2
-        room2.append(newWallStart)
-
-        if a < b:
-            if c < d:
-                room2.extend(structureNodes[a + 1:c + 1])
-            else:
-                room2.extend(structureNodes[a + 1:d + 1])
-        else:
-            if c < d:
-                room2.extend(structureNodes[b + 1:c + 1])
-            else:
-                room2.extend(structureNodes[b + 1:d + 1])
-
-        room2.append(newWallEnd)
-
-        return room1, room2
-
     def recursiveAreaDivision(self, structure, minArea):
         # randomly determine the current structure's internal wall assets.
 
         if structure['speciality'] == False:
             self.currentStructureAssets = {
-                'wall':   self.genericStructureAssets['interiorWalls'][random.randint(0, len(self.genericStructureAssets['interiorWalls']) - 1)],
-                'door':   self.genericStructureAssets['doors'][random.randint(0, len(self.genericStructureAssets['doors']) - 1)],
+                'wall':   self.genericStructureAssets['interiorWalls'][self.random.randint(0, len(self.genericStructureAssets['interiorWalls']) - 1)],
+                'door':   self.genericStructureAssets['doors'][self.random.randint(0, len(self.genericStructureAssets['doors']) - 1)],
                 'sill':   None,
                 'window': None}
         else:
             self.currentStructureAssets = {
-                'wall':   self.specialityStructureAssets['interiorWalls'][random.randint(0, len(self.specialityStructureAssets['interiorWalls']) - 1)],
-                'door':   self.specialityStructureAssets['doors'][random.randint(0, len(self.specialityStructureAssets['doors']) - 1)],
+                'wall':   self.specialityStructureAssets['interiorWalls'][self.random.randint(0, len(self.specialityStructureAssets['interiorWalls']) - 1)],
+                'door':   self.specialityStructureAssets['doors'][self.random.randint(0, len(self.specialityStructureAssets['doors']) - 1)],
                 'sill':   None,
                 'window': None}
 
@@ -1007,131 +846,129 @@ class Dungeonify:
             self.vttStructures.append([])
             return []
 
-        # area = self.calcPolygonArea(structure)
-        # if area > minArea:
-        #     self.recursiveDivision(structure, minArea)
+    # Splits the structure into rooms, then keeps splitting every room larger than minArea, until none are left or
+    # maxRooms is reached. The rooms wait in a queue rather than being recursed into, so large structures cannot hit
+    # Python's recursion limit, and the work done is in proportion to the rooms made. Every internal wall is drawn,
+    # and added to the structure's VTT entry followed by an EXTERIOR marker. Returns the start and end node of every
+    # internal wall, one after the other.
+    def recursiveDivision(self, structureNodes, minArea, maxRooms=None):
+        if maxRooms is None:
+            maxRooms = self.maxRooms
 
-    def recursiveDivision(self, structureNodes, minArea):
-        nodes = [-1, -1, -1, -1]
-
-        # + self.getAllNodes(interiorWalls)
-        allNodes = self.getAllNodes(structureNodes)
+        vttStructure = []
+        internalWallNodes = []
 
-        # for i in range(numberOfSplits):
-        nodes[0], nodes[1] = self.nodePairOfLongestDistanceBetweenNodes(
-            structureNodes)
-        if nodes[0]['x'] == nodes[1]['x']:
-            # vertical wall so new wall is horizontal
-            # make interior wall half way down longest wall
-            newWallStart = {'x': nodes[0]['x'], 'y':  int(
-                abs(nodes[1]['y'] + nodes[0]['y']) / 2)}
+        rooms = 1
+        roomQueue = deque([structureNodes])
+        while roomQueue and rooms < maxRooms:
+            roomNodes = roomQueue.popleft()
 
-            if nodes[0]['y'] < nodes[1]['y']:
-                iterator = 1
-                max = self.imageWidthSquares
-            else:
-                iterator = -1
-                max = -1
-
-            foundWall = False
-            for j in range(newWallStart['x'] + iterator, max, iterator):
-                newWallEnd = {'x': j, 'y': newWallStart['y']}
-                if (newWallEnd in allNodes):
-                    foundWall = True
-                    break
-            if not foundWall:
-                raise Exception(
-                    'Exception: wall not found in recursiveDivision')
+            split = self.splitRoom(roomNodes)
+            if split is None:
+                # Too narrow, or no wall to meet. This room stays as it is.
+                continue
+            rooms += 1
 
+            newWallStart, newWallEnd = split['wall']
             self.generateAssetsBetweenNodes(
-                'horizontal', True, False, None, newWallStart, newWallEnd, iterator)
+                split['orientation'], True, False, None, newWallStart, newWallEnd, split['iterator'])
             self.vttStructure.insert(0, {'node': newWallStart, 'type': 'Wall'})
-            # self.vttStructure.insert(0, {'node': {'x': -1, 'y': -1}, 'type': 'INTERIOR'})
             self.vttStructure.append(
                 {'node': {'x': -1, 'y': -1}, 'type': 'EXTERIOR'})
-            self.vttStructures.append(self.vttStructure)
+            vttStructure.extend(self.vttStructure)
+            self.vttStructure = []
 
-            nodes[2], nodes[3] = self.findWallWhichContainsNode(
-                structureNodes, newWallEnd)
+            internalWallNodes.extend(split['wall'])
 
-            wall1Index = min(structureNodes.index(
-                nodes[0]), structureNodes.index(nodes[1]))
-            wall2Index = min(structureNodes.index(
-                nodes[2]), structureNodes.index(nodes[3]))
+            for room in split['rooms']:
+                if self.calcPolygonArea(room) > minArea:
+                    roomQueue.append(room)
 
-            if wall1Index < wall2Index:
-                room1, room2 = self.determineRooms(
-                    1, structureNodes, newWallStart, newWallEnd, nodes)
-            else:
-                room1, room2 = self.determineRooms(
-                    2, structureNodes, newWallStart, newWallEnd, nodes)
+        self.vttStructures.append(vttStructure)
+        return internalWallNodes
 
-        else:
+    # Finds the wall which splits a room in two: from half way along its longest wall, straight across to the first
+    # wall on the other side. Returns the new wall, how to draw it and the two rooms, or None if there is no wall
+    # across which is inside the room and long enough for a door.
+    def splitRoom(self, roomNodes):
+        perimeter = PerimeterIndex(roomNodes)
+
+        node1, node2 = self.nodePairOfLongestDistanceBetweenNodes(roomNodes)
+        longestWallIndex = next(index for index in range(len(roomNodes) - 1)
+                                if roomNodes[index] is node1 and roomNodes[index + 1] is node2)
+
+        if node1['x'] == node2['x']:
             # vertical wall so new wall is horizontal
             # make interior wall half way down longest wall
+            orientation = 'horizontal'
+            newWallStart = {'x': node1['x'], 'y': int(
+                abs(node2['y'] + node1['y']) / 2)}
+            preferredIterator = 1 if node1['y'] < node2['y'] else -1
+        else:
+            orientation = 'vertical'
             newWallStart = {
-                'x': int(abs(nodes[1]['x'] + nodes[0]['x']) / 2), 'y': nodes[0]['y']}
-
-            if nodes[0]['x'] < nodes[1]['x']:
-                iterator = -1
-                max = -1
-            else:
-                iterator = 1
-                max = self.imageHeightSquares
-
-            foundWall = False
-            newWallEnd = {}
-            for j in range(newWallStart['y'] + iterator, max, iterator):
-                newWallEnd = {'x': newWallStart['x'], 'y': j}
-                if (newWallEnd in allNodes):
-                    foundWall = True
-                    break
-
-            if not foundWall:
-                raise Exception(
-                    'Exception: wall not found in recursiveDivision')
-
-            self.generateAssetsBetweenNodes(
-                'vertical', True, False, None, newWallStart, newWallEnd, iterator)
-            self.vttStructure.insert(0, {'node': newWallStart, 'type': 'Wall'})
-            # self.vttStructure.insert(0, {'node': {'x': -1, 'y': -1}, 'type': 'INTERIOR'})
-            self.vttStructure.append(
-                {'node': {'x': -1, 'y': -1}, 'type': 'EXTERIOR'})
-            self.vttStructures.append(self.vttStructure)
-
-            nodes[2], nodes[3] = self.findWallWhichContainsNode(
-                structureNodes, newWallEnd)
-
-            a = structureNodes.index(nodes[0])
-            b = structureNodes.index(nodes[1])
-            c = structureNodes.index(nodes[2])
-            d = structureNodes.index(nodes[3])
-
-            wall1Index = min(a, b)
-            wall2Index = min(c, d)
-
-            if wall1Index < wall2Index:
-                room1, room2 = self.determineRooms(
-                    1, structureNodes, newWallStart, newWallEnd, nodes)
+                'x': int(abs(node2['x'] + node1['x']) / 2), 'y': node1['y']}
+            preferredIterator = -1 if node1['x'] < node2['x'] else 1
+
+        if newWallStart == node1 or newWallStart == node2:
+            return None
+
+        # The preferred side should be the inside, but try the other side if it is not.
+        for iterator in (preferredIterator, -preferredIterator):
+            if orientation == 'horizontal':
+                max = self.imageWidthSquares if iterator == 1 else -1
+                newWallEnd = perimeter.firstCellFrom(
+                    newWallStart, iterator, 0, max)
             else:
-                room1, room2 = self.determineRooms(
-                    2, structureNodes, newWallStart, newWallEnd, nodes)
-
-        self.vttStructure = []
-
-        # Do it again?
-        # annoyingly calcPolygonArea is sometimes zero
-
-        room1Area = self.calcPolygonArea(room1)
-        room2Area = self.calcPolygonArea(room2)
-
-        return [newWallStart, newWallEnd]
-
-        # if room1Area > minArea and room2Area > minArea:
-        #     self.recursiveDivision(room1, minArea)
-        #     self.recursiveDivision(room2, minArea)
+                max = self.imageHeightSquares if iterator == 1 else -1
+                newWallEnd = perimeter.firstCellFrom(
+                    newWallStart, 0, iterator, max)
+
+            if newWallEnd is None:
+                continue
+
+            # generateAssetsBetweenNodes needs at least three squares to fit a door in.
+            if self.manhattenDistance(newWallStart, newWallEnd) < 3:
+                continue
+
+            # Nothing lies between the ends of the new wall, so it is inside if its middle is.
+            if not perimeter.containsPoint((newWallStart['x'] + newWallEnd['x']) / 2, (newWallStart['y'] + newWallEnd['y']) / 2):
+                continue
+
+            room1, room2 = self.splitRoomNodes(
+                roomNodes, longestWallIndex, newWallStart, perimeter.wallIndexContaining(newWallEnd), newWallEnd)
+            return {'wall': [newWallStart, newWallEnd], 'orientation': orientation, 'iterator': iterator,
+                    'rooms': [room1, room2]}
+
+        return None
+
+    # Cuts a closed node cycle in two along a new wall, from a node on wall startWallIndex to one on wall
+    # endWallIndex. Both rooms are closed node cycles going the same way round as the original.
+    def splitRoomNodes(self, roomNodes, startWallIndex, newWallStart, endWallIndex, newWallEnd):
+        cornerCount = len(roomNodes) - 1
+
+        room1 = [newWallStart]
+        index = startWallIndex + 1
+        while True:
+            room1.append(roomNodes[index % cornerCount])
+            if index % cornerCount == endWallIndex:
+                break
+            index += 1
+        if room1[-1] != newWallEnd:
+            room1.append(newWallEnd)
+        room1.append(newWallStart)
+
+        room2 = [newWallEnd]
+        index = endWallIndex + 1
+        while True:
+            room2.append(roomNodes[index % cornerCount])
+            if index % cornerCount == startWallIndex:
+                break
+            index += 1
+        room2.append(newWallStart)
+        room2.append(newWallEnd)
 
-        #     return 0
+        return room1, room2
 
     def generateExterior(self, structure, structureIndex, internalWallNodes):
         addDoor = False
@@ -1141,16 +978,16 @@ class Dungeonify:
 
         if structure['speciality'] == False:
             self.currentStructureAssets = {
-                'wall':   self.genericStructureAssets['exteriorWalls'][random.randint(0, len(self.genericStructureAssets['exteriorWalls']) - 1)],
-                'door':   self.genericStructureAssets['doors'][random.randint(0, len(self.genericStructureAssets['doors']) - 1)],
-                'sill':   self.genericStructureAssets['sills'][random.randint(0, len(self.genericStructureAssets['sills']) - 1)],
-                'window': self.genericStructureAssets['windows'][random.randint(0, len(self.genericStructureAssets['windows']) - 1)]}
+                'wall':   self.genericStructureAssets['exteriorWalls'][self.random.randint(0, len(self.genericStructureAssets['exteriorWalls']) - 1)],
+                'door':   self.genericStructureAssets['doors'][self.random.randint(0, len(self.genericStructureAssets['doors']) - 1)],
+                'sill':   self.genericStructureAssets['sills'][self.random.randint(0, len(self.genericStructureAssets['sills']) - 1)],
+                'window': self.genericStructureAssets['windows'][self.random.randint(0, len(self.genericStructureAssets['windows']) - 1)]}
         else:
             self.currentStructureAssets = {
-                'wall':   self.specialityStructureAssets['exteriorWalls'][random.randint(0, len(self.specialityStructureAssets['exteriorWalls']) - 1)],
-                'door':   self.specialityStructureAssets['doors'][random.randint(0, len(self.specialityStructureAssets['doors']) - 1)],
-                'sill':   self.specialityStructureAssets['sills'][random.randint(0, len(self.specialityStructureAssets['sills']) - 1)],
-                'window': self.specialityStructureAssets['windows'][random.randint(0, len(self.specialityStructureAssets['windows']) - 1)]}
+                'wall':   self.specialityStructureAssets['exteriorWalls'][self.random.randint(0, len(self.specialityStructureAssets['exteriorWalls']) - 1)],
+                'door':   self.specialityStructureAssets['doors'][self.random.randint(0, len(self.specialityStructureAssets['doors']) - 1)],
+                'sill':   self.specialityStructureAssets['sills'][self.random.randint(0, len(self.specialityStructureAssets['sills']) - 1)],
+                'window': self.specialityStructureAssets['windows'][self.random.randint(0, len(self.specialityStructureAssets['windows']) - 1)]}
 
         # length = self.calculatePerimeterLength(structure)
         # spotsForADoor = length - len(structure)
@@ -1167,7 +1004,7 @@ class Dungeonify:
             if (xDifferent >= 3 or yDifferent >= 3):
                 doorAbleWallNodes.append(currentNode)
 
-        randomIndex = random.randint(0, len(doorAbleWallNodes) - 1)
+        randomIndex = self.random.randint(0, len(doorAbleWallNodes) - 1)
 
         # append the first node
         self.vttStructure.append({'node': structureNodes[0], 'type': 'Wall'})
@@ -1245,50 +1082,65 @@ class Dungeonify:
         # calculate what the average asset dimensions are... --> or just ask the user for dpi?
         # recaluclate everything's size for self.pixelsPerGridSquare to be asset sized.
 
-        # setup image synthesis:
-        base = Image.open('AnglesRule.png')
-
         # All references to 'speciality' below are for religious structures.
-        exterior_floors = self.loadFloorAssets(r'assets\floor\exterior\*.jpg')
-        interior_floors = self.loadFloorAssets(r'assets\floor\interior\*.jpg')
-        speciality_floors = self.loadFloorAssets(r'assets\floor\special\*.jpg')
-
-        pillars = self.loadWallAssets(r'assets\pillar\wood\*.png')
-        speciality_pillars = self.loadWallAssets(
-            r'assets\pillar\special\*.png')
-
-        exterior_walls = self.loadWallAssets(r'assets\wall\exterior\*.png')
-        interior_walls = self.loadWallAssets(r'assets\wall\interior\*.png')
-        doors = self.loadWallAssets(r'assets\door\single\*.png')
-        windows = self.loadWallAssets(r'assets\window\*.png')
-        sills = self.loadWallAssets(r'assets\sill\*.png')
-
-        specialityWalls = self.loadWallAssets(r'assets\wall\special\*.png')
-        specialityDoors = self.loadWallAssets(
-            r'assets\door\single\special\*.png')
-        specialitySills = self.loadWallAssets(r'assets\sill\special\*.png')
-        specialityWindows = self.loadWallAssets(r'assets\window\special\*.png')
+        exterior_floors = self.loadFloorAssets('exteriorFloors')
+        interior_floors = self.loadFloorAssets('interiorFloors')
+        speciality_floors = self.loadFloorAssets('specialityFloors')
+
+        # Every sprite, scaled and turned once for the whole battlemap.
+        self.spriteAtlas = self.loadSpriteAtlas()
+
+        pillars = self.spriteAtlas.variants('pillars')
+        speciality_pillars = self.spriteAtlas.variants('specialityPillars')
+
+        exterior_walls = self.spriteAtlas.variants('exteriorWalls')
+        interior_walls = self.spriteAtlas.variants('interiorWalls')
+        doors = self.spriteAtlas.variants('doors')
+        windows = self.spriteAtlas.variants('windows')
+        sills = self.spriteAtlas.variants('sills')
+
+        specialityWalls = self.spriteAtlas.variants('specialityWalls')
+        specialityDoors = self.spriteAtlas.variants('specialityDoors')
+        specialitySills = self.spriteAtlas.variants('specialitySills')
+        specialityWindows = self.spriteAtlas.variants('specialityWindows')
+
+        # Each structure draws its floor, walls and pillars from its own generator, in that order.
+        self.random = self.structureRandom('map')
+        structureRandoms = [self.structureRandom(self.structureKey(structureIndex))
+                            for structureIndex in range(len(structures))]
 
         # Generate Floor:
-        compositeFloor = exterior_floors[random.randint(
-            0, len(exterior_floors) - 1)]
-        for structure in self.newStructuresArray:
+        floorWidth = int(self.imageWidthSquares * pixelsPerGridSquareInt)
+        floorHeight = int(self.imageHeightSquares * pixelsPerGridSquareInt)
+        compositeFloor = exterior_floors[self.random.randint(
+            0, len(exterior_floors) - 1)].canvas(floorWidth, floorHeight)
+        for structureIndex, structure in enumerate(self.newStructuresArray):
+            self.random = structureRandoms[structureIndex]
             polygonStructures = []
             for node in structure['nodes']:
                 polygonStructures.append((int(node['x'] * assetSizeMultiplicator + pixelsPerGridSquareInt), int(
                     node['y'] * assetSizeMultiplicator + pixelsPerGridSquareInt)))
 
             if structure['speciality'] == False:
-                interiorFloor = interior_floors[random.randint(
+                interiorFloor = interior_floors[self.random.randint(
                     0, len(interior_floors) - 1)]
             else:
-                interiorFloor = speciality_floors[random.randint(
+                interiorFloor = speciality_floors[self.random.randint(
                     0, len(speciality_floors) - 1)]
-            mask = Image.new("L", interiorFloor.size, 0)
+
+            # Only the structure's bounding box (within the map) is tiled and masked.
+            left = max(min(x for x, y in polygonStructures), 0)
+            top = max(min(y for x, y in polygonStructures), 0)
+            right = min(max(x for x, y in polygonStructures) + 1, floorWidth)
+            bottom = min(max(y for x, y in polygonStructures) + 1, floorHeight)
+            if left >= right or top >= bottom:
+                continue
+
+            mask = Image.new("L", (right - left, bottom - top), 0)
             draw = ImageDraw.Draw(mask)
-            draw.polygon(polygonStructures, outline=255, fill=255)
-            compositeFloor = Image.composite(
-                interiorFloor, compositeFloor, mask)
+            draw.polygon([(x - left, y - top) for x, y in polygonStructures], outline=255, fill=255)
+            compositeFloor.paste(interiorFloor.region(
+                left, top, right, bottom), (left, top), mask)
 
         self.new_image = Image.new('RGB', (int(self.imageWidthSquares * pixelsPerGridSquareInt), int(
             self.imageHeightSquares * pixelsPerGridSquareInt)), (255, 255, 255))
@@ -1308,9 +1160,11 @@ class Dungeonify:
 
         # Generate Walls:
 
-        minArea = 50
+        minArea = self.minRoomArea
         internalWallNodes = []
         for structureIndex in range(len(structures)):
+            self.random = structureRandoms[structureIndex]
+
             # internal walls
             internalWallNodes = self.recursiveAreaDivision(
                 structures[structureIndex], minArea)
@@ -1322,22 +1176,25 @@ class Dungeonify:
         # for :
 
         # Generate Pillars:
-        for newStructure in structures:
+        for structureIndex, newStructure in enumerate(structures):
+            self.random = structureRandoms[structureIndex]
             if newStructure['speciality'] == False:
-                pillar = pillars[random.randint(0, len(pillars) - 1)]
+                pillar = pillars[self.random.randint(0, len(pillars) - 1)]
             else:
-                pillar = speciality_pillars[random.randint(
+                pillar = speciality_pillars[self.random.randint(
                     0, len(speciality_pillars) - 1)]
 
+            pillar, pillarMask = self.spriteAtlas.sprite(*pillar, 'vertical')
+
             structure = []
             for node in newStructure['nodes'][:-1]:
                 x = (node['x'] * pixelsPerGridSquareInt) + \
                     halfPixelsPerGridSquareInt
                 y = (node['y'] * pixelsPerGridSquareInt) + \
                     halfPixelsPerGridSquareInt
-                self.new_image.paste(pillar, (x, y), mask=pillar)
+                self.new_image.paste(pillar, (x, y), mask=pillarMask)
 
-        self.new_image.save("testDungeonify.png", "PNG")
+        self.outputImage(self.new_image, "testDungeonify.png")
         self.structures = structures
 
     def manhattenDistance(self, fromNode, toNode):
@@ -1407,57 +1264,13 @@ class Dungeonify:
         return angle
 
     def angleForTwoNodes(self, currentNode, prevNode):
-        vector1 = [currentNode['x'] - prevNode['x'],
-                   currentNode['y'] - prevNode['y']]
-
-        # Find the largest side, horizontal or vertical.
-        vector2 = [0, 0]
-        if abs(vector1[0]) > abs(vector1[1]):
-            vector2 = [currentNode['x'] - prevNode['x'],
-                       currentNode['y'] - currentNode['y']]
-        else:
-            vector2 = [currentNode['x'] - currentNode['x'],
-                       currentNode['y'] - prevNode['y']]
-
-        return self.calculateAngle(vector1, vector2)
+        return orthogonalise.angleForTwoNodes(currentNode, prevNode)
 
     def calculateAngle(self, vector1, vector2):
-        # same y, ie relative to the horizontal.
-        unit_vector_1 = vector1 / np.linalg.norm(vector1)
-        unit_vector_2 = vector2 / np.linalg.norm(vector2)
-
-    #    # using cross-product formula
-    #    return -math.degrees(math.asin((self.a * other.b - self.b * other.a)/(self.length()*other.length())))
-    #    # the dot-product formula, left here just for comparison (does not return angles in the desired range)
-    #    # return math.degrees(math.acos((self.a * other.a + self.b * other.b)/(self.length()*other.length())))
-
-        # unsigned angle
-        # dot_product = np.dot(unit_vector_1, unit_vector_2)
-        # angle = np.arccos(dot_product)
-
-        angle = np.arctan2(np.cross(unit_vector_1, unit_vector_2),
-                           np.dot(unit_vector_1, unit_vector_2))
-
-        return math.degrees(angle)
-
-        # unit_vector_1 = vector1 / np.linalg.norm(vector1)
-        # unit_vector_2 = vector2 / np.linalg.norm(vector2)
-        # dot_product = np.dot(unit_vector_1, unit_vector_2)
-        # angle = np.arccos(dot_product)
-        # return angle
+        return orthogonalise.calculateAngle(vector1, vector2)
 
     def rotateNode(self, origin, point, angle):
-        angleRadians = math.radians(angle)
-        # Rotate a point counterclockwise by a given angle around a given origin.
-        # The angleRadians should be given in radians.
-        ox, oy = origin['x'], origin['y']
-        px, py = point['x'], point['y']
-
-        qx = ox + math.cos(angleRadians) * (px - ox) - \
-            math.sin(angleRadians) * (py - oy)
-        qy = oy + math.sin(angleRadians) * (px - ox) + \
-            math.cos(angleRadians) * (py - oy)
-        return {'x': qx, 'y': qy}
+        return orthogonalise.rotateNode(origin, point, angle)
 
     def distanceBetweenNodes_xy(self, previousNode, currentNode):
         xDifference = currentNode['x'] - previousNode['x']
@@ -1493,17 +1306,15 @@ class Dungeonify:
                 prevNode = currentNode
         print(f"--- END ---")
 
+    # Snapping to the grid, the ties are broken as documented in grid_quantisation.py.
     def roundToNearestInch(self, x):
-        return self.roundNearest(x, self.pixelsPerGridSquare)
+        return snapNearest(x, self.pixelsPerGridSquare)
 
     def roundNearest(self, number: float, roundedTo: float) -> float:
-        number, roundedTo = Decimal(str(number)), Decimal(str(roundedTo))
-        return float(round(number / roundedTo) * roundedTo)
+        return snapNearest(number, roundedTo)
 
     def roundDown(self, number: float, roundedTo: float) -> float:
-        number, roundedTo = Decimal(str(number)), Decimal(str(roundedTo))
-        return float(math.floor(number / roundedTo) * roundedTo)
+        return snapDown(number, roundedTo)
 
     def roundUp(self, number: float, roundedTo: float) -> float:
-        number, roundedTo = Decimal(str(number)), Decimal(str(roundedTo))
-        return float(math.ceil(number / roundedTo) * roundedTo)
+        return snapUp(number, roundedTo)
@@ -0,0 +1,63 @@
+from PIL import Image
+
+from asset_pyramid import SOURCE_GRID_SIZE
+
+# File    : floor_texture.py
+# Classes : FloorTexture
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : A floor texture which is tiled across the battlemap. Only the file name is kept until the texture is
+#               first used, when the single tile is decoded. The tiled image is then made just for the region a
+#               floor covers (a structure's bounding box, or the whole map for the exterior), so memory grows with
+#               the textures actually chosen and the area they cover, rather than with every texture installed.
+#               The tiles always line up as if the texture covered the whole map from its top left corner.
+#
+#               The tile is drawn at gridSize pixels per grid square, scaled from the texture's own
+#               SOURCE_GRID_SIZE. It is taken from an AssetPyramid when one is given.
+
+
+class FloorTexture:
+    def __init__(self, path, assetPyramid=None, gridSize=SOURCE_GRID_SIZE):
+        self.path = path
+        self.assetPyramid = assetPyramid
+        self.gridSize = gridSize
+        self.tileImage = None
+
+    def tile(self):
+        if self.tileImage is None:
+            if self.assetPyramid is not None:
+                self.tileImage = self.assetPyramid.load(
+                    self.path, self.gridSize)
+                return self.tileImage
+
+            try:
+                tileImage = Image.open(self.path)
+                tileImage.load()
+            except OSError:
+                raise FileNotFoundError(f"No asset Found in '{self.path}'")
+
+            if self.gridSize != SOURCE_GRID_SIZE:
+                scale = self.gridSize / SOURCE_GRID_SIZE
+                tileImage = tileImage.resize((max(1, round(tileImage.width * scale)),
+                                              max(1, round(tileImage.height * scale))), Image.LANCZOS)
+            self.tileImage = tileImage
+        return self.tileImage
+
+    # The tiled texture covering the whole map.
+    def canvas(self, width, height):
+        return self.region(0, 0, width, height)
+
+    # The tiled texture covering the box from (left, top) up to, but not including, (right, bottom) of the map.
+    def region(self, left, top, right, bottom):
+        tile = self.tile()
+        tileWidth, tileHeight = tile.size
+
+        regionImage = Image.new('RGB', (right - left, bottom - top))
+        # The first tiles which reach into the region, at their place on the whole map.
+        firstX = left - left % tileWidth
+        firstY = top - top % tileHeight
+        for i in range(firstX, right, tileWidth):
+            for j in range(firstY, bottom, tileHeight):
+                regionImage.paste(tile, (i - left, j - top))
+
+        return regionImage
@@ -0,0 +1,138 @@
+import math
+from decimal import Decimal
+
+import numpy as np
+
+# File    : grid_quantisation.py
+# Classes : None
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Snaps coordinates to a grid step (the pixels per grid square), either one at a time or a whole array in
+#               one NumPy operation. This replaces converting every coordinate to str and then to Decimal.
+#
+#               Tie breaking, which reproduces the original Decimal results exactly:
+#                 - snapNearest rounds a coordinate exactly half way between two grid lines to the even multiple of
+#                   the step (round half to even, like Python's round). e.g. with a step of 10, 15 --> 20, 25 --> 20.
+#                 - snapDown and snapUp are floor and ceil, exact multiples of the step are left where they are.
+#                 - A result of zero is always 0.0, never -0.0, as the Decimal path returned an int zero.
+#
+#               The float division x / step can itself round onto a tie or a grid line the exact value is not on. For
+#               an integer step the grid lines and the ties half way between them are exact floats, so x is compared
+#               against them to correct the quotient. The Decimal path worked on the shortest decimal form of x rather
+#               than its exact binary value, but the two always round the same way for an integer step: a tie or grid
+#               line is then a float of its own, which the shortest decimal form of a different float never reaches.
+#               Non integer steps, which pixelsPerGridSquare never is, keep using Decimal so they are unchanged too.
+
+# Beyond this a multiple of the step, or a point half way between two, may no longer be an exact float.
+EXACT_LIMIT = 2.0 ** 50
+
+
+def isExactStep(step):
+    step = float(step)
+    return step > 0 and step.is_integer() and step < EXACT_LIMIT
+
+
+# Single coordinates.
+
+def snapNearest(x, step):
+    if not isExactStep(step) or not abs(x) < EXACT_LIMIT:
+        return decimalNearest(x, step)
+
+    quotient = round(x / step)
+    upperTie = (2 * quotient + 1) * step / 2
+    lowerTie = (2 * quotient - 1) * step / 2
+    if x > upperTie or (x == upperTie and quotient % 2 == 1):
+        quotient += 1
+    elif x < lowerTie or (x == lowerTie and quotient % 2 == 1):
+        quotient -= 1
+    return float(quotient * step) + 0.0
+
+
+def snapDown(x, step):
+    if not isExactStep(step) or not abs(x) < EXACT_LIMIT:
+        return decimalDown(x, step)
+
+    quotient = math.floor(x / step)
+    if quotient * step > x:
+        quotient -= 1
+    elif (quotient + 1) * step <= x:
+        quotient += 1
+    return float(quotient * step) + 0.0
+
+
+def snapUp(x, step):
+    if not isExactStep(step) or not abs(x) < EXACT_LIMIT:
+        return decimalUp(x, step)
+
+    quotient = math.ceil(x / step)
+    if quotient * step < x:
+        quotient += 1
+    elif (quotient - 1) * step >= x:
+        quotient -= 1
+    return float(quotient * step) + 0.0
+
+
+# Whole arrays of coordinates, returning a new float64 array of the same shape.
+
+def snapNearestArray(values, step):
+    values = np.asarray(values, dtype=np.float64)
+    if not isExactStep(step) or not np.all(np.abs(values) < EXACT_LIMIT):
+        return decimalArray(decimalNearest, values, step)
+
+    step = float(step)
+    quotients = np.rint(values / step)
+    upperTies = (2 * quotients + 1) * step / 2
+    lowerTies = (2 * quotients - 1) * step / 2
+    isOdd = np.fmod(quotients, 2) != 0
+    quotients += (values > upperTies) | ((values == upperTies) & isOdd)
+    quotients -= (values < lowerTies) | ((values == lowerTies) & isOdd)
+    return quotients * step + 0.0
+
+
+def snapDownArray(values, step):
+    values = np.asarray(values, dtype=np.float64)
+    if not isExactStep(step) or not np.all(np.abs(values) < EXACT_LIMIT):
+        return decimalArray(decimalDown, values, step)
+
+    step = float(step)
+    quotients = np.floor(values / step)
+    tooHigh = quotients * step > values
+    tooLow = (quotients + 1) * step <= values
+    quotients -= tooHigh
+    quotients += tooLow
+    return quotients * step + 0.0
+
+
+def snapUpArray(values, step):
+    values = np.asarray(values, dtype=np.float64)
+    if not isExactStep(step) or not np.all(np.abs(values) < EXACT_LIMIT):
+        return decimalArray(decimalUp, values, step)
+
+    step = float(step)
+    quotients = np.ceil(values / step)
+    tooLow = quotients * step < values
+    tooHigh = (quotients - 1) * step >= values
+    quotients += tooLow
+    quotients -= tooHigh
+    return quotients * step + 0.0
+
+
+# The original Decimal rounding, the reference the functions above match.
+
+def decimalNearest(number, roundedTo):
+    number, roundedTo = Decimal(str(number)), Decimal(str(roundedTo))
+    return float(round(number / roundedTo) * roundedTo)
+
+
+def decimalDown(number, roundedTo):
+    number, roundedTo = Decimal(str(number)), Decimal(str(roundedTo))
+    return float(math.floor(number / roundedTo) * roundedTo)
+
+
+def decimalUp(number, roundedTo):
+    number, roundedTo = Decimal(str(number)), Decimal(str(roundedTo))
+    return float(math.ceil(number / roundedTo) * roundedTo)
+
+
+def decimalArray(snap, values, step):
+    return np.array([snap(value, step) for value in values.ravel().tolist()], dtype=np.float64).reshape(values.shape)
@@ -0,0 +1,293 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from grid_quantisation import snapNearest
+
+# File    : orthogonalise.py
+# Classes : None
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : The per structure geometry of the repositioned buildings stage: rotating each wall onto the grid's
+#               horizontal or vertical, snapping to the grid and tidying the result. Everything here is a plain
+#               function of a structure and the grid size, with no cairo or Dungeonify state, so the structures can
+#               be worked on in other processes. Dungeonify.redrawForDegreesStructures draws the results.
+
+# Fewer structures than this are orthogonalised in this process, as starting the worker processes costs more.
+PARALLEL_MIN_STRUCTURES = 50
+# Structures sent to a worker process at a time.
+PARALLEL_CHUNK_SIZE = 8
+
+# The worker processes, started on first use and kept for later selections.
+executor = None
+executorWorkers = None
+
+
+# The whole stage for one structure, the result is a closed node cycle.
+def orthogonaliseStructure(structure, pixelsPerGridSquare):
+    return finishStructure(gridStructure(structure, pixelsPerGridSquare))
+
+
+# The first half of the stage, the structure rotated onto the grid and simplified. Moving the structure by a whole
+# (even) number of grid squares moves the result by the same amount, which is what lets OrthogonaliseCache keep it
+# apart from where the structure is in the selection.
+def gridStructure(structure, pixelsPerGridSquare):
+    tempStructure = structure
+
+    currentStructure = removeDuplicateNodes(structure)
+    tempStructure = currentStructure
+
+    currentStructure = rotateAllNodes(tempStructure, pixelsPerGridSquare)
+    tempStructure = currentStructure
+
+    currentStructure = simplifyNodes(tempStructure)
+
+    return currentStructure
+
+
+# The rest of the stage, which depends on where the structure is (fixNegativeNodes moves it off the negative side of
+# the selection).
+def finishStructure(structure):
+    tempStructure = structure
+
+    currentStructure = fixNegativeNodes(tempStructure)
+    tempStructure = currentStructure
+
+    currentStructure = fillNodeGaps(tempStructure)
+    tempStructure = currentStructure
+
+    # Make the structure a node cycle
+    currentStructure['nodes'].append(currentStructure['nodes'][0])
+
+    return currentStructure
+
+
+def orthogonaliseChunk(structures, pixelsPerGridSquare, structureFunction=orthogonaliseStructure):
+    return [structureFunction(structure, pixelsPerGridSquare) for structure in structures]
+
+
+# Orthogonalises every structure, returning them in the same order. With workers set to more than one, and at least
+# minStructures structures, the structures are split into chunks which are worked on in a pool of processes. The
+# work is the same pure Python either way, so the results are identical to doing it here. workers=None uses
+# every CPU. structureFunction is what is done to each structure, e.g. gridStructure for only the first half.
+def orthogonaliseStructures(structures, pixelsPerGridSquare, workers=None, minStructures=PARALLEL_MIN_STRUCTURES,
+                            chunkSize=PARALLEL_CHUNK_SIZE, structureFunction=orthogonaliseStructure):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(structures) < max(minStructures, 2):
+        return orthogonaliseChunk(structures, pixelsPerGridSquare, structureFunction)
+
+    chunks = [structures[start:start + chunkSize]
+              for start in range(0, len(structures), chunkSize)]
+
+    # map returns the chunks in the order they were given, whichever worker finishes first.
+    orthogonalisedChunks = getExecutor(workers).map(
+        orthogonaliseChunk, chunks, [pixelsPerGridSquare] * len(chunks), [structureFunction] * len(chunks))
+
+    return [structure for chunk in orthogonalisedChunks for structure in chunk]
+
+
+def getExecutor(workers):
+    global executor, executorWorkers
+
+    if executor is None or executorWorkers != workers:
+        if executor is not None:
+            executor.shutdown()
+        executor = ProcessPoolExecutor(max_workers=workers)
+        executorWorkers = workers
+
+    return executor
+
+
+def removeDuplicateNodes(structure):
+    newStructure = {'nodes': [],
+                    'speciality': structure['speciality']}
+
+    for nodeIndex in range(len(structure['nodes']) - 1):
+        if structure['nodes'][nodeIndex] != structure['nodes'][nodeIndex + 1]:
+            newStructure['nodes'].append(structure['nodes'][nodeIndex])
+
+    if structure['nodes'][len(structure['nodes']) - 1] != structure['nodes'][0]:
+        newStructure['nodes'].append(
+            structure['nodes'][len(structure['nodes']) - 1])
+
+    return newStructure
+
+
+def rotateAllNodes(structure, pixelsPerGridSquare):
+    inchCorrectedNode = {'x': 0, 'y': 0}
+
+    newStructure = {'nodes': [],
+                    'speciality': structure['speciality']}
+
+    currentNode = structure['nodes'][0]
+
+    inchCorrectedNode['x'] = snapNearest(
+        currentNode['x'], pixelsPerGridSquare)
+    inchCorrectedNode['y'] = snapNearest(
+        currentNode['y'], pixelsPerGridSquare)
+
+    newStructure['nodes'].append(inchCorrectedNode)
+    # still -2 as we just added two extras to the end
+    for index in range(len(structure['nodes']) - 1):
+        nextNode = structure['nodes'][index + 1]
+        # nextNextNode = newStructure['nodes'][index + 2]
+        # Round nextNode nearest inch here too?
+        # angle = angleForTwoNodes2(currentNode, nextNode, nextNextNode)
+        #angle = angleForTwoNodes3(currentNode, nextNode)
+        angle = angleForTwoNodes(currentNode, nextNode)
+        # northNode = {'x': currentNode['x'], 'y': currentNode['y'] - 1}
+        # angle1 = angleForThreeNodes(northNode, currentNode, nextNode)
+        # angle between the vector and the horizontal or vertical - whichever is longer.
+        # angle = angleForTwoNodes(nextNode, currentNode)
+
+        # TODO: make the round to nearest inch calc occur within rotating the node as this may fix the error with diagonal nodes.
+        rotatedNode = rotateNode(currentNode, nextNode, angle)
+        inchCorrectedNode = {'x': 0, 'y': 0}
+        inchCorrectedNode['x'] = snapNearest(
+            rotatedNode['x'], pixelsPerGridSquare)
+        inchCorrectedNode['y'] = snapNearest(
+            rotatedNode['y'], pixelsPerGridSquare)
+        newStructure['nodes'].append(inchCorrectedNode)
+        currentNode = inchCorrectedNode
+
+    return newStructure
+
+
+# Tidies a structure in one pass: repeated nodes are dropped, as is the middle node of any three in a row which are
+# exactly horizontally or vertically in line (i.e. it adds no value), including across the join between the last
+# node and the first. The result is an open ring, the last node is not repeated at the end. The nodes are kept, not
+# copied.
+def simplifyNodes(structure):
+    nodes = []
+    for node in structure['nodes']:
+        if nodes and nodes[-1] == node:
+            continue
+
+        while len(nodes) >= 2 and isInLine(nodes[-2], nodes[-1], node):
+            nodes.pop()
+
+        # Removing a spike, e.g. (0, 0) --> (0, 5) --> (0, 0), leaves the same node twice.
+        if nodes and nodes[-1] == node:
+            continue
+        nodes.append(node)
+
+    # The same again across the join back to the first node. first is where the ring now starts.
+    first = 0
+    while len(nodes) - first >= 3:
+        if nodes[-1] == nodes[first]:
+            nodes.pop()
+        elif isInLine(nodes[-2], nodes[-1], nodes[first]):
+            nodes.pop()
+        elif isInLine(nodes[-1], nodes[first], nodes[first + 1]):
+            first += 1
+        else:
+            break
+
+    return {'nodes': nodes[first:], 'speciality': structure['speciality']}
+
+
+def isInLine(previousNode, currentNode, nextNode):
+    return (previousNode['x'] == currentNode['x'] == nextNode['x']) or \
+        (previousNode['y'] == currentNode['y'] == nextNode['y'])
+
+
+def fixNegativeNodes(structure):
+    minX = min(structure['nodes'], key=lambda x: x['x'])[
+        'x']
+    minY = min(structure['nodes'], key=lambda x: x['y'])[
+        'y']
+
+    if minX < 0:
+        for node in structure['nodes']:
+            node['x'] += abs(minX)
+    if minY < 0:
+        for node in structure['nodes']:
+            node['y'] += abs(minY)
+
+    return structure
+
+
+def fillNodeGaps(structure):
+    newStructure = {'nodes': [],
+                    'speciality': structure['speciality']}
+    #fill in gaps
+
+    # structure['nodes'].append(structure['nodes'][0])
+    for index in range(0, len(structure['nodes']) - 1):
+        currentNode = structure['nodes'][index]
+        nextNode = structure['nodes'][index + 1]
+
+        if currentNode['x'] != nextNode['x'] and currentNode['y'] != nextNode['y']:
+            newNode = currentNode
+            newNode['y'] = nextNode['y']
+            newStructure['nodes'].append(newNode)
+        newStructure['nodes'].append(currentNode)
+
+    # newStructure['nodes'].append(
+    #     structure['nodes'][len(structure['nodes']) - 1])
+
+    if structure['nodes'][len(structure['nodes']) - 1]['x'] != structure['nodes'][0]['x'] \
+            and structure['nodes'][len(structure['nodes']) - 1]['y'] != structure['nodes'][0]['y']:
+
+        if structure['nodes'][len(structure['nodes']) - 3]['x'] == structure['nodes'][len(structure['nodes']) - 2]['x']:
+            newNode = structure['nodes'][len(structure['nodes']) - 1]
+            newNode['x'] = structure['nodes'][0]['x']
+            newStructure['nodes'].append(newNode)
+        elif structure['nodes'][len(structure['nodes']) - 3]['y'] == structure['nodes'][len(structure['nodes']) - 2]['y']:
+            newNode = structure['nodes'][len(structure['nodes']) - 1]
+            newNode['y'] = structure['nodes'][0]['y']
+            newStructure['nodes'].append(newNode)
+    else:
+        newStructure['nodes'].append(
+            structure['nodes'][len(structure['nodes']) - 1])
+
+    # newStructure['nodes'].append(newStructure['nodes'][0])
+
+    return newStructure
+
+
+def angleForTwoNodes(currentNode, prevNode):
+    vector1 = [currentNode['x'] - prevNode['x'],
+               currentNode['y'] - prevNode['y']]
+
+    # Find the largest side, horizontal or vertical.
+    vector2 = [0, 0]
+    if abs(vector1[0]) > abs(vector1[1]):
+        vector2 = [currentNode['x'] - prevNode['x'],
+                   currentNode['y'] - currentNode['y']]
+    else:
+        vector2 = [currentNode['x'] - currentNode['x'],
+                   currentNode['y'] - prevNode['y']]
+
+    return calculateAngle(vector1, vector2)
+
+
+def calculateAngle(vector1, vector2):
+    # same y, ie relative to the horizontal.
+    unit_vector_1 = vector1 / np.linalg.norm(vector1)
+    unit_vector_2 = vector2 / np.linalg.norm(vector2)
+
+    # The 2D cross product, written out as np.cross no longer takes 2D vectors. It is the same sum np.cross made.
+    cross = unit_vector_1[0] * unit_vector_2[1] - \
+        unit_vector_1[1] * unit_vector_2[0]
+    angle = np.arctan2(cross, np.dot(unit_vector_1, unit_vector_2))
+
+    return math.degrees(angle)
+
+
+def rotateNode(origin, point, angle):
+    angleRadians = math.radians(angle)
+    # Rotate a point counterclockwise by a given angle around a given origin.
+    # The angleRadians should be given in radians.
+    ox, oy = origin['x'], origin['y']
+    px, py = point['x'], point['y']
+
+    qx = ox + math.cos(angleRadians) * (px - ox) - \
+        math.sin(angleRadians) * (py - oy)
+    qy = oy + math.sin(angleRadians) * (px - ox) + \
+        math.cos(angleRadians) * (py - oy)
+    return {'x': qx, 'y': qy}
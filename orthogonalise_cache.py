@@ -0,0 +1,207 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+
+import numpy as np
+
+import orthogonalise
+from grid_quantisation import snapDown, snapNearest, snapUp
+
+# File    : orthogonalise_cache.py
+# Classes : OrthogonaliseCache
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Is used to keep each structure's orthogonalised (rotated, snapped and simplified) grid polygon on disk,
+#               so that rendering the same buildings again skips the geometry processing. The stage's input is shifted
+#               and zoomed with the rest of the selection, so each structure is worked on in a frame of its own: it
+#               is moved by a whole number of grid squares to near the origin first, and the result moved back. An
+#               entry is keyed by the OSM way id and version the structure came from, the grid scale and the shape
+#               of the structure about its own corner, so the same building is a hit from any selection while an
+#               edited way, or one projected at another scale, is worked out again. A hit where the building sits
+#               differently against the grid than when it was cached is moved to the nearest grid square. Entries
+#               are compressed pickles, evicted least recently used first once the cache grows past its size cap.
+
+# Part of every key, so entries worked out by an older orthogonalise.py (e.g. with different rounding in its angles)
+# are never served. Raise it whenever a change to orthogonalise.py can change its output.
+CACHE_VERSION = 3
+# The structure's shape is rounded to this many pixels in its key, so the rounding left over from shifting and
+# zooming it with the selection does not change the key.
+SHAPE_RESOLUTION = 0.001
+
+
+class OrthogonaliseCache:
+    def __init__(self, directory='.orthogonalise_cache', maxBytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+
+        self.hits = 0
+        self.misses = 0
+        self.bytesWritten = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    # orthogonalise.orthogonaliseStructures, reusing the cached result for every structure which has one. ways is
+    # the (way id, way version) of each structure, -1 for a structure not from a known way, which is never cached.
+    def orthogonaliseStructures(self, structures, ways, pixelsPerGridSquare, workers=None):
+        frames = [structureFrame(structure, pixelsPerGridSquare) for structure in structures]
+        keys = [self.key(wayId, wayVersion, pixelsPerGridSquare, structure)
+                for structure, (wayId, wayVersion) in zip(structures, ways)]
+
+        results = []
+        missing = []
+        for index, key in enumerate(keys):
+            entry = None if key is None else self.get(key)
+            if entry is None:
+                missing.append(index)
+                results.append(None)
+            else:
+                results.append(placeEntry(entry, frames[index], structures[index], pixelsPerGridSquare))
+
+        # Everything not cached is worked out in one batch, in each structure's own frame, on several processes for
+        # large selections.
+        localStructures = [moveStructure(structures[index], frames[index][0], -1) for index in missing]
+        gridStructures = orthogonalise.orthogonaliseStructures(
+            localStructures, pixelsPerGridSquare, workers, structureFunction=orthogonalise.gridStructure)
+
+        for index, gridStructure in zip(missing, gridStructures):
+            entry = (frames[index][1], [(node['x'], node['y']) for node in gridStructure['nodes']])
+            if keys[index] is not None:
+                self.put(keys[index], entry)
+            results[index] = placeEntry(entry, frames[index], structures[index], pixelsPerGridSquare)
+
+        if len(missing) > 0:
+            self.evict()
+
+        return results
+
+    # None when the structure is not from a known OSM way.
+    def key(self, wayId, wayVersion, pixelsPerGridSquare, structure):
+        if wayId < 0:
+            return None
+
+        coordinates = np.array([(node['x'], node['y'])
+                               for node in structure['nodes']], dtype=np.float64)
+        shape = np.rint((coordinates - coordinates.min(axis=0)) / SHAPE_RESOLUTION).astype(np.int64)
+        digest = hashlib.sha1(shape.tobytes()).hexdigest()[:16]
+        return f"v{CACHE_VERSION}-{wayId}-{wayVersion}-{float(pixelsPerGridSquare)!r}-{digest}"
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.orthz')
+
+    def get(self, key):
+        path = self.path(key)
+
+        try:
+            with open(path, 'rb') as cacheFile:
+                entry = pickle.loads(zlib.decompress(cacheFile.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+
+        # Touch the file, its modification time is what the least recently used eviction orders by. Another process
+        # may have evicted it since it was read, which makes no difference to this hit.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return entry
+
+    # entry is the structure's corner and its gridStructure nodes, in its own frame.
+    def put(self, key, entry):
+        compressed = zlib.compress(pickle.dumps(
+            entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+        # Write to a temporary file first, so a reader never sees a half written entry.
+        handle, temporaryPath = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as cacheFile:
+            cacheFile.write(compressed)
+        os.replace(temporaryPath, self.path(key))
+
+        self.bytesWritten += len(compressed)
+
+    def evict(self):
+        entries = []
+        totalBytes = 0
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith('.orthz'):
+                continue
+            path = os.path.join(self.directory, fileName)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+            totalBytes += status.st_size
+
+        # Oldest access first.
+        entries.sort()
+        for _, size, path in entries:
+            if totalBytes <= self.maxBytes:
+                break
+            self.remove(path)
+            totalBytes -= size
+            self.evictions += 1
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for fileName in os.listdir(self.directory):
+            if fileName.endswith('.orthz'):
+                self.remove(os.path.join(self.directory, fileName))
+
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes written': self.bytesWritten,
+                'evictions': self.evictions}
+
+
+# The (origin, corner) of the structure's own frame. The origin is a multiple of two grid squares, so moving the
+# structure by it changes neither which grid line a node snaps to nor which way a tie half way between two rounds
+# (to the even one). It is on the same side of zero as the structure and no further out, so taking it away from a
+# coordinate is exact. The corner is the structure's lowest x and y in the frame.
+def structureFrame(structure, pixelsPerGridSquare):
+    origin = []
+    corner = []
+    for axis in ('x', 'y'):
+        values = [node[axis] for node in structure['nodes']]
+        low, high = min(values), max(values)
+        if low >= 0:
+            axisOrigin = snapDown(low, 2 * pixelsPerGridSquare)
+        elif high <= 0:
+            axisOrigin = snapUp(high, 2 * pixelsPerGridSquare)
+        else:
+            axisOrigin = 0.0
+        origin.append(axisOrigin)
+        corner.append(low - axisOrigin)
+
+    return tuple(origin), tuple(corner)
+
+
+# A new structure with every node moved by direction (1 or -1) times the offset.
+def moveStructure(structure, offset, direction):
+    offsetX, offsetY = offset[0] * direction, offset[1] * direction
+    return {'nodes': [{'x': node['x'] + offsetX, 'y': node['y'] + offsetY} for node in structure['nodes']],
+            'speciality': structure['speciality']}
+
+
+# The orthogonalised structure from a cached entry, moved back to where the structure is in the selection. When the
+# structure's corner is not where it was in the cached frame, the entry is also moved by the nearest whole number of
+# grid squares to the difference.
+def placeEntry(entry, frame, structure, pixelsPerGridSquare):
+    (originX, originY), (cornerX, cornerY) = frame
+    (entryCornerX, entryCornerY), nodes = entry
+
+    offsetX = originX + snapNearest(cornerX - entryCornerX, pixelsPerGridSquare)
+    offsetY = originY + snapNearest(cornerY - entryCornerY, pixelsPerGridSquare)
+    gridStructure = {'nodes': [{'x': x + offsetX, 'y': y + offsetY} for x, y in nodes],
+                     'speciality': structure['speciality']}
+
+    return orthogonalise.finishStructure(gridStructure)
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+
+# File    : osm_cache.py
+# Classes : OsmMapCache
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Is used to keep the OSM API's Map responses on disk, so that loading the same location again skips both
+#               the download and the XML parse. Entries are keyed by the normalised bounding box, stored as
+#               compressed pickles, expire after a time to live and are evicted least recently used first once the
+#               cache grows past its size cap.
+
+
+class OsmMapCache:
+    def __init__(self, directory='.osm_cache', maxBytes=256 * 1024 * 1024, timeToLive=7 * 24 * 60 * 60, precision=6):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        # Seconds an entry is served for after it was downloaded.
+        self.timeToLive = timeToLive
+        # Decimal places the bounding box is rounded to, so float noise in the same location hits the same entry.
+        self.precision = precision
+
+        self.hits = 0
+        self.misses = 0
+        # The uncompressed size of the responses served from disk, i.e. what did not need to be downloaded.
+        self.bytesServed = 0
+        self.bytesWritten = 0
+        self.evictions = 0
+        # The counters are updated from every thread fetching through the cache.
+        self.statisticsLock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    # Returns the Map response for the bounding box, calling api.Map only when there is no fresh cached copy.
+    def map(self, api, min_lon, min_lat, max_lon, max_lat):
+        key = self.key(min_lon, min_lat, max_lon, max_lat)
+
+        sector = self.get(key)
+        if sector is None:
+            sector = api.Map(min_lon, min_lat, max_lon, max_lat)
+            self.put(key, sector)
+
+        return sector
+
+    def key(self, min_lon, min_lat, max_lon, max_lat):
+        lngs = sorted((round(float(min_lon), self.precision),
+                      round(float(max_lon), self.precision)))
+        lats = sorted((round(float(min_lat), self.precision),
+                      round(float(max_lat), self.precision)))
+
+        text = f"{lngs[0]:.{self.precision}f},{lats[0]:.{self.precision}f},{lngs[1]:.{self.precision}f},{lats[1]:.{self.precision}f}"
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.osmz')
+
+    def get(self, key):
+        path = self.path(key)
+
+        try:
+            with open(path, 'rb') as cacheFile:
+                payload = pickle.loads(zlib.decompress(cacheFile.read()))
+            fetched, data = payload['fetched'], payload['data']
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+            self.count(misses=1)
+            return None
+
+        if time.time() - fetched > self.timeToLive:
+            self.remove(path)
+            self.count(misses=1)
+            return None
+
+        # Touch the file, its modification time is what the least recently used eviction orders by. Another thread
+        # may have evicted it since it was read, which does not matter as the sector is already read.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.count(hits=1, bytesServed=len(data))
+        return pickle.loads(data)
+
+    def count(self, hits=0, misses=0, bytesServed=0, bytesWritten=0, evictions=0):
+        with self.statisticsLock:
+            self.hits += hits
+            self.misses += misses
+            self.bytesServed += bytesServed
+            self.bytesWritten += bytesWritten
+            self.evictions += evictions
+
+    def put(self, key, sector):
+        # The sector is pickled once, and kept as bytes inside the payload, whose size is then known without
+        # pickling it again.
+        data = pickle.dumps(sector, protocol=pickle.HIGHEST_PROTOCOL)
+        payload = {'fetched': time.time(), 'data': data}
+        compressed = zlib.compress(pickle.dumps(
+            payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+        # Write to a temporary file first, so a reader never sees a half written entry.
+        handle, temporaryPath = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as cacheFile:
+            cacheFile.write(compressed)
+        os.replace(temporaryPath, self.path(key))
+
+        self.count(bytesWritten=len(compressed))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        totalBytes = 0
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith('.osmz'):
+                continue
+            path = os.path.join(self.directory, fileName)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+            totalBytes += status.st_size
+
+        # Oldest access first.
+        entries.sort()
+        for _, size, path in entries:
+            if totalBytes <= self.maxBytes:
+                break
+            self.remove(path)
+            totalBytes -= size
+            self.count(evictions=1)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for fileName in os.listdir(self.directory):
+            if fileName.endswith('.osmz'):
+                self.remove(os.path.join(self.directory, fileName))
+
+    def statistics(self):
+        with self.statisticsLock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes served': self.bytesServed,
+                    'bytes written': self.bytesWritten, 'evictions': self.evictions}
@@ -1,8 +1,11 @@
 from osmapi import OsmApi
 from coord_conversion import CoordConversion
-# import tag_tables
-# from tag_tables import x
+from osm_reader import readOsmFile
+from structure_buffer import StructureBuffer
+from tag_tables import TagClassifier, SPECIALITY_STRUCTURE, isStructureCategory, isRoadCategory
+import io
 import math
+import numpy as np
 # import drawSvg as draw
 import cairo
 
@@ -16,6 +19,9 @@ import cairo
 # Create API
 myApi = OsmApi()
 
+# Compiled once from the rule table in tag_tables.py, used to classify and colour every way.
+tagClassifier = TagClassifier()
+
 # proper colours:
 # https://github.com/gravitystorm/openstreetmap-carto/blob/master/style/roads.mss
 
@@ -40,66 +46,6 @@ myApi = OsmApi()
 # Handy dandy reg exp for vscode:
 # (building 	[\w]* 	)
 
-# # All Roads Red
-tagData = {
-    # Structures
-    'building': '0000FF',
-    'brand': '0000FF',
-    'abutters': '0000FF',
-    'name': '0000FF',
-    'addr:housenumber': '0000FF',
-    'addr:city': '0000FF',
-    'house': '0000FF',
-    'craft': '0000FF',
-    'emergency': '0000FF',
-    'office': '0000FF',
-    'shop': '0000FF',
-    'sport': '0000FF',
-    'telecom': '0000FF',
-    'tourism': '0000FF',
-    'place_of_worship': '0AA0FF',
-
-    # Roads, paths, etc.
-    'highway': 'FF0000',
-    'footway': 'FF0000',
-    'cycleway': 'FF0000',
-    'busway': 'FF0000',
-    'aerialway': 'FF0000',
-    'aeroway': 'FF0000',
-    'electrified': 'FF0000',
-    'bicycle': 'FF0000',
-    'bridge': 'FF0000',
-    'cycleway:both': 'FF0000',
-    'public_footpath': 'FF0000',
-    'access': 'FF0000',
-    'designation': 'FF0000',
-    'foot': 'FF0000',
-
-    # Wildlife grass areas: the broads
-    'natural': '00FF00',
-    'note': '00FF00',
-
-    # Region of land: residential zoning
-    'landuse': '888888',
-
-    #e.g. fencing
-    'barrier': '0FFFF0',
-
-    # Just remove these:
-    'boat': 'FFFFFF',
-    'fixme': 'FFFFFF',
-    '': 'FFFFFF',
-    'amenity': 'FFFFFF',
-    'addr:postcode': 'FFFFFF',
-    'parking': 'FFFFFF',
-    'park': 'FFFFFF',
-    'default1': 'FFFFFF',
-    'leisure': 'FFFFFF',
-
-    'source': '00FF00',
-    'default2': '000000'
-}
-
 colourHexOutline = ''
 colourHexFill = ''
 
@@ -116,8 +62,29 @@ colourHexFill = ''
 
 
 class GenerateOSM():
-    def generate(self, lng, lat, SCREEN_WIDTH, SCREEN_HEIGHT):
-        latLngZoomFactor = 0.002
+    def __init__(self, osmFile=None, cache=None, fetcher=None, latLngZoomFactor=0.002):
+        # When set, the map data is read from this local .osm file (a path or a file-like stream) instead of
+        # being downloaded from the OSM API.
+        self.osmFile = osmFile
+        # An optional OsmMapCache, used to skip downloading a location which has already been loaded.
+        self.cache = cache
+        # An optional TiledOsmFetcher, used to download areas larger than a single Map call allows.
+        self.fetcher = fetcher
+        # How far, in degrees, the area loaded reaches from its centre.
+        self.latLngZoomFactor = latLngZoomFactor
+
+        # (way id, node id) pairs which were referenced by a way but not returned with the map data.
+        self.unresolvedNodeRefs = []
+
+        # The structures of the last generate call, in the compact array backed form.
+        self.structureBuffer = None
+        # The PNG bytes of the last generate call's preview of the area.
+        self.previewPng = None
+
+    # Returns the structures as a list of {'nodes': [...], 'speciality': bool} dicts, or when compact is True as a
+    # StructureBuffer, which never builds the per node dicts.
+    def generate(self, lng, lat, SCREEN_WIDTH, SCREEN_HEIGHT, compact=False):
+        latLngZoomFactor = self.latLngZoomFactor
         screenRatioA = SCREEN_WIDTH / SCREEN_HEIGHT
         screenRatioB = SCREEN_HEIGHT / SCREEN_WIDTH
         lng_upper = float(lng) + latLngZoomFactor * screenRatioA
@@ -178,7 +145,7 @@ class GenerateOSM():
 
         # I think the order depends on which hemisphere it is in, or the side of the planet?
         # The osmAPI data for the region
-        sector = myApi.Map(
+        sector = self.fetchSector(
             topLeft['lng'], bottomRight['lat'], bottomRight['lng'],  topLeft['lat'])
 
         nodes = [n for n in sector if n['type'] == 'node']
@@ -191,7 +158,26 @@ class GenerateOSM():
 
         ways_tags = [t['tag'] for t in ways_data]
 
+        # Index the nodes by id once, then resolve every way's node references against it in a single pass.
+        nodesById = indexNodesById(nodes_data)
+        resolvedWays, self.unresolvedNodeRefs = resolveWays(
+            ways_data, nodesById)
+
+        if len(self.unresolvedNodeRefs) > 0:
+            print(f"Warning: {len(self.unresolvedNodeRefs)} node references could not be resolved and were skipped.")
+
+        # Project every node of the fetch to screen coordinates in a single call.
+        screenPositions = projectNodes(
+            coordinateSystem, nodesById, xModifier)
+
         structures = []
+        # The flat x, y buffer, node offsets and flags the StructureBuffer is built from.
+        structureCoordinates = []
+        structureOffsets = [0]
+        structureSpeciality = []
+        # The OSM way each structure came from, so results worked out for a way can be reused while it is unchanged.
+        structureWayIds = []
+        structureWayVersions = []
 
         roads = []
         #   Start Cairo
@@ -204,94 +190,43 @@ class GenerateOSM():
         ctx.set_source(pat)
         ctx.fill()
 
-        for way in ways_data:
-            nodes = way['nd']
-
-            key = ''
-            specialityStructure = False
-
-            if way['tag']:
-                # print(way['tag'])
-
-                key = next(iter(way['tag']))
-                if key == 'amenity' and way['tag']['amenity'] == 'place_of_worship':
-                    colourHexOutline = tagData['place_of_worship']
-                    specialityStructure = True
-                elif key in tagData.keys():
-                    # print(key + ", ")
-                    colourHexOutline = tagData[key]
-
-                    # if isinstance(colourDict, dict):
-                    #     value = way['tag'].get(key)
-
-                    #     if value in colourDict.keys():
-                    #         colourHexOutline = colourDict[value]
-                    #     else:
-                    #         colourHexOutline = colourDict['default']
-                    # else:
-                    #     colourHexOutline = tagData['default']
-                else:
-                    # print("2. " + key)
-                    colourHexOutline = tagData['default2']
-            else:
-                colourHexOutline = tagData['default1']
-
-            # #find the tag to determine the color
-            # key = ''
-            # if way['tag']:
-            #     key = next(iter(way['tag']))
-            #     if key in tagData.keys():
-            #         colourDict = tagData[key]
-
-            #         if isinstance(colourDict, dict):
-            #             value = way['tag'].get(key)
-
-            #             if value in colourDict.keys():
-            #                 colourHexOutline = colourDict[value]
-            #             else:
-            #                 colourHexOutline = colourDict['default']
-            #         else:
-            #             colourHexOutline = tagData['default']
-            #     else:
-            #         colourHexOutline = tagData['default']
-            # else:
-            #     colourHexOutline = tagData['default']
-
-            # colour = tuple(int(colourHexOutline[i:i+2], 16) for i in (0, 2, 4))
-            r = int(colourHexOutline[0:2], 16) / 256
-            g = int(colourHexOutline[2:4], 16) / 256
-            b = int(colourHexOutline[4:6], 16) / 256
-
-            # print("'%s' : '%s' was colour (%s,%s,%s)" %( key, value, r,g,b))
+        for way, nodes in resolvedWays:
+
+            # The classification depends on all of the way's tags, not on which one the API returned first.
+            category = tagClassifier.classify(way['tag'])
+            specialityStructure = category == SPECIALITY_STRUCTURE
+            wayIsStructure = isStructureCategory(category)
+            wayIsRoad = isRoadCategory(category)
+
+            r, g, b = tagClassifier.colour(category)
 
             ctx.set_source_rgb(r, g, b)  # Solid color
 
-            structureNodes = []
+            structureNodeCount = 0
             roadNodes = []
             for node in nodes:
-                # May be inefficent at large scale
-                node = [n for n in nodes_data if n['id'] == node][0]
-
-                coordinate = coordinateSystem.latlngToScreenXY(
-                    node['lat'], node['lon'], xModifier)
+                coordinate = screenPositions[node['id']]
 
                 # The x & y out of the total width & height.
                 ctx.line_to(coordinate['x'] / WIDTH, coordinate['y'] / HEIGHT)
 
-                if isStructure(colourHexOutline):
+                if wayIsStructure:
                     # wk15: removing lat/long from outside this python file.
                     # structureNodes.append({'x': coordinate['x'],'y': coordinate['y'], 'latitude': node['lat'], 'longitude': node['lon']})
 
-                    structureNodes.append(
-                        {'x': coordinate['x'], 'y': coordinate['y']})
-                elif isRoad(colourHexOutline):
+                    structureCoordinates.append(coordinate['x'])
+                    structureCoordinates.append(coordinate['y'])
+                    structureNodeCount += 1
+                elif wayIsRoad:
                     roadNodes.append(
                         {'x': coordinate['x'], 'y': coordinate['y']})
 
-            if len(structureNodes) != 0:
-                # structures.append( structureNodes)
-                structures.append(
-                    {'nodes': structureNodes, 'speciality': specialityStructure})
+            if structureNodeCount != 0:
+                structureOffsets.append(
+                    structureOffsets[-1] + structureNodeCount)
+                structureSpeciality.append(specialityStructure)
+                structureWayIds.append(way.get('id', -1))
+                structureWayVersions.append(way.get('version', -1))
 
             if len(roadNodes) != 0:
                 roads.append(roadNodes)
@@ -299,16 +234,74 @@ class GenerateOSM():
             ctx.move_to(0, 0)
             ctx.close_path()
 
-            if isStructure(colourHexOutline):
+            if wayIsStructure:
                 ctx.fill()
 
             ctx.set_line_width(2 / WIDTH)
             ctx.stroke()
 
-        surface.write_to_png("example.png")  # Output to PNG
+        # Output to PNG, kept in memory for the viewer and saved scenes.
+        previewFile = io.BytesIO()
+        surface.write_to_png(previewFile)
+        self.previewPng = previewFile.getvalue()
+
+        self.structureBuffer = StructureBuffer(
+            structureCoordinates, structureOffsets, structureSpeciality, structureWayIds, structureWayVersions)
+
+        if compact:
+            structures = self.structureBuffer
+        else:
+            structures = self.structureBuffer.toStructures()
 
         return structures, roads, {'horizontal': inchesPerPixel_horizontalbattlemap, 'vertical': inchesPerPixel_verticalBattlemap}
 
+    # Collects the OSM elements within the area, from the local file, the tiled fetcher, the cache or the API.
+    def fetchSector(self, min_lon, min_lat, max_lon, max_lat):
+        if self.osmFile is not None:
+            return readOsmFile(self.osmFile, min_lon, min_lat, max_lon, max_lat)
+        elif self.fetcher is not None:
+            return self.fetcher.map(min_lon, min_lat, max_lon, max_lat)
+        elif self.cache is not None:
+            return self.cache.map(myApi, min_lon, min_lat, max_lon, max_lat)
+        return myApi.Map(min_lon, min_lat, max_lon, max_lat)
+
+
+def indexNodesById(nodes_data):
+    # Builds a hash index of the nodes, so each way's node reference can be looked up in O(1).
+    return {node['id']: node for node in nodes_data}
+
+
+def resolveWays(ways_data, nodesById):
+    # Resolves each way's node ids to the node data. References to nodes missing from the index are
+    # collected as (way id, node id) pairs and skipped instead of raising an IndexError.
+    resolvedWays = []
+    unresolvedNodeRefs = []
+    for way in ways_data:
+        wayNodes = []
+        for nodeId in way['nd']:
+            node = nodesById.get(nodeId)
+            if node is None:
+                unresolvedNodeRefs.append((way.get('id'), nodeId))
+            else:
+                wayNodes.append(node)
+        resolvedWays.append((way, wayNodes))
+
+    return resolvedWays, unresolvedNodeRefs
+
+
+def projectNodes(coordinateSystem, nodesById, xModifier):
+    # Converts every node's lat / lng to screen x / y with one vectorised call, returning them by node id.
+    nodeIds = list(nodesById.keys())
+    lats = np.fromiter((node['lat'] for node in nodesById.values()),
+                       dtype=np.float64, count=len(nodeIds))
+    lngs = np.fromiter((node['lon'] for node in nodesById.values()),
+                       dtype=np.float64, count=len(nodeIds))
+
+    screenX, screenY = coordinateSystem.latlngArrayToScreenXY(
+        lats, lngs, xModifier)
+
+    return {nodeId: {'x': x, 'y': y} for nodeId, x, y in zip(nodeIds, screenX.tolist(), screenY.tolist())}
+
 
 def distanceBetweenNodes_inches(latStart, latEnd, longStart, longEnd):
     import geopy.distance
@@ -0,0 +1,104 @@
+import xml.etree.ElementTree as ElementTree
+
+# File    : osm_reader.py
+# Classes : None
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Is used to read OSM data out of a local .osm XML file (or any file-like stream), instead of the OSM API.
+#               The file is parsed incrementally, and only the nodes and ways within the requested area are kept,
+#               so that memory use stays flat on very large extracts. The elements are returned in the same format
+#               as osmapi's Map call, so the rest of the pipeline cannot tell the difference.
+
+
+def readOsmFile(source, min_lon, min_lat, max_lon, max_lat):
+    # A path, or any stream which can be rewound, is read twice. The first pass finds the ways which touch the
+    # area, the second collects their nodes which lie outside of it. This matches the OSM API, which returns
+    # every node of every way that crosses the area.
+    # A stream which cannot be rewound is read once, keeping only the ways which lie entirely within the area.
+    if isinstance(source, str):
+        with open(source, 'rb') as osmFile:
+            return readOsmFile(osmFile, min_lon, min_lat, max_lon, max_lat)
+
+    twoPass = hasattr(source, 'seekable') and source.seekable()
+    if twoPass:
+        startPosition = source.tell()
+
+    nodesById = {}
+    ways = []
+
+    for element in iterateOsmElements(source):
+        if element.tag == 'node':
+            lat = float(element.get('lat'))
+            lon = float(element.get('lon'))
+
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                node = nodeData(element, lat, lon)
+                nodesById[node['id']] = node
+        elif element.tag == 'way':
+            nodeRefs = [int(nd.get('ref')) for nd in element.iter('nd')]
+
+            if twoPass:
+                isWanted = any(ref in nodesById for ref in nodeRefs)
+            else:
+                isWanted = all(ref in nodesById for ref in nodeRefs)
+
+            if isWanted:
+                ways.append(wayData(element, nodeRefs))
+
+    if twoPass:
+        # Second pass: the nodes referenced by a kept way, but which lie outside of the area.
+        missingIds = {ref for way in ways for ref in way['nd']
+                      if ref not in nodesById}
+
+        if len(missingIds) > 0:
+            source.seek(startPosition)
+            for element in iterateOsmElements(source):
+                if element.tag == 'node':
+                    nodeId = int(element.get('id'))
+                    if nodeId in missingIds:
+                        nodesById[nodeId] = nodeData(
+                            element, float(element.get('lat')), float(element.get('lon')))
+                elif element.tag == 'way':
+                    # Nodes are always written before the ways in an .osm file.
+                    break
+
+    # Only keep the nodes which are used by a way, that is all the pipeline needs.
+    usedIds = {ref for way in ways for ref in way['nd']}
+    nodesById = {nodeId: node for nodeId,
+                 node in nodesById.items() if nodeId in usedIds}
+
+    sector = [{'type': 'node', 'data': node} for node in nodesById.values()]
+    sector.extend({'type': 'way', 'data': way} for way in ways)
+    return sector
+
+
+def iterateOsmElements(source):
+    # Yields each complete top level element (node, way or relation), clearing it once used so that the
+    # parsed tree never grows.
+    context = ElementTree.iterparse(source, events=('start', 'end'))
+    _, root = next(context)
+
+    for event, element in context:
+        if event == 'end' and element.tag in ('node', 'way', 'relation'):
+            yield element
+            element.clear()
+            root.clear()
+
+
+def elementTags(element):
+    return {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+
+
+def nodeData(element, lat, lon):
+    return {'id': int(element.get('id')),
+            'version': int(element.get('version', 0)),
+            'lat': lat,
+            'lon': lon,
+            'tag': elementTags(element)}
+
+
+def wayData(element, nodeRefs):
+    return {'id': int(element.get('id')),
+            'version': int(element.get('version', 0)),
+            'nd': nodeRefs,
+            'tag': elementTags(element)}
@@ -0,0 +1,88 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from osmapi import OsmApi
+
+# File    : osm_tiles.py
+# Classes : TiledOsmFetcher
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Is used to fetch areas larger than the OSM API's Map call accepts. The area is split into tiles which
+#               are fetched at the same time on a bounded thread pool, then the tiles are merged back together. A
+#               node or way which appears in several tiles (such as a building cut by a tile edge, which the API
+#               returns whole in every tile it touches) is only kept once, so it comes out as a single structure.
+
+
+class TiledOsmFetcher:
+    def __init__(self, endpoint='https://www.openstreetmap.org', maxWorkers=4, tileSize=0.01, cache=None):
+        # The API server to fetch from, e.g. a local stand in server when testing.
+        self.endpoint = endpoint
+        # The most requests in flight at once. Keep it within what the endpoint allows.
+        self.maxWorkers = maxWorkers
+        # The width and height of a tile in degrees.
+        self.tileSize = tileSize
+        # An optional OsmMapCache, each tile is cached on its own.
+        self.cache = cache
+
+        # osmapi keeps a http session per object, so each worker thread gets its own.
+        self.threadData = threading.local()
+
+    # Has the same arguments and result as OsmApi.Map.
+    def map(self, min_lon, min_lat, max_lon, max_lat):
+        tiles = self.splitIntoTiles(min_lon, min_lat, max_lon, max_lat)
+
+        if len(tiles) == 1 or self.maxWorkers <= 1:
+            sectors = [self.fetchTile(tile) for tile in tiles]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.maxWorkers, len(tiles))) as executor:
+                # map keeps the tile order, so the merged result does not depend on which request finished first.
+                sectors = list(executor.map(self.fetchTile, tiles))
+
+        return mergeSectors(sectors)
+
+    def splitIntoTiles(self, min_lon, min_lat, max_lon, max_lat):
+        min_lon, max_lon = sorted((float(min_lon), float(max_lon)))
+        min_lat, max_lat = sorted((float(min_lat), float(max_lat)))
+
+        # The small tolerance stops float noise adding a sliver tile when the area is a whole number of tiles.
+        columns = max(1, math.ceil((max_lon - min_lon) / self.tileSize - 1e-9))
+        rows = max(1, math.ceil((max_lat - min_lat) / self.tileSize - 1e-9))
+        tileWidth = (max_lon - min_lon) / columns
+        tileHeight = (max_lat - min_lat) / rows
+
+        tiles = []
+        for row in range(rows):
+            for column in range(columns):
+                # The last row and column end exactly on the requested edge.
+                tiles.append((min_lon + column * tileWidth,
+                              min_lat + row * tileHeight,
+                              max_lon if column == columns -
+                              1 else min_lon + (column + 1) * tileWidth,
+                              max_lat if row == rows - 1 else min_lat + (row + 1) * tileHeight))
+        return tiles
+
+    def fetchTile(self, tile):
+        api = getattr(self.threadData, 'api', None)
+        if api is None:
+            api = OsmApi(api=self.endpoint)
+            self.threadData.api = api
+
+        if self.cache is not None:
+            return self.cache.map(api, *tile)
+        return api.Map(*tile)
+
+
+def mergeSectors(sectors):
+    # Merges several Map results, keeping one copy of each element. When copies differ the newest version wins.
+    merged = {}
+    for sector in sectors:
+        for element in sector:
+            key = (element['type'], element['data']['id'])
+            existing = merged.get(key)
+            if existing is None or element['data'].get('version', 0) > existing['data'].get('version', 0):
+                merged[key] = element
+
+    # Nodes before ways before relations, like a single Map call.
+    typeOrder = {'node': 0, 'way': 1, 'relation': 2}
+    return sorted(merged.values(), key=lambda element: typeOrder.get(element['type'], 3))
@@ -0,0 +1,86 @@
+import math
+
+# File    : perimeter_index.py
+# Classes : PerimeterIndex
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : An occupancy index of the grid cells on a structure's perimeter. Each cell maps back to the wall (edge)
+#               it lies on, so checking whether a cell is on the perimeter and finding the wall which contains it
+#               are both single dictionary lookups, rather than scans over every cell of every wall.
+
+
+class PerimeterIndex:
+    # structureNodes are grid coordinates of a closed node cycle (the last node repeats the first).
+    def __init__(self, structureNodes):
+        self.structureNodes = structureNodes
+        # (x, y) --> the index of the first wall whose cells include it.
+        self.wallOfCell = {}
+
+        for index in range(len(structureNodes) - 1):
+            currentNode = structureNodes[index]
+            nextNode = structureNodes[index + 1]
+
+            xDifferent = nextNode['x'] - currentNode['x']
+            yDifferent = nextNode['y'] - currentNode['y']
+
+            # Like getAllNodes, each wall covers the cells from its first node up to, but not including, its last.
+            if xDifferent != 0:
+                #change in x
+                iterator = int(math.copysign(1, xDifferent))
+                constantCoordinate = currentNode['y']
+                for varyingCoordinate in range(currentNode['x'], nextNode['x'], iterator):
+                    self.wallOfCell.setdefault(
+                        (varyingCoordinate, constantCoordinate), index)
+
+            elif yDifferent != 0:
+                #change in y
+                iterator = int(math.copysign(1, yDifferent))
+                constantCoordinate = currentNode['x']
+                for varyingCoordinate in range(currentNode['y'], nextNode['y'], iterator):
+                    self.wallOfCell.setdefault(
+                        (constantCoordinate, varyingCoordinate), index)
+
+    def __contains__(self, node):
+        return (node['x'], node['y']) in self.wallOfCell
+
+    def __len__(self):
+        return len(self.wallOfCell)
+
+    # The index of the first wall containing the node, or None.
+    def wallIndexContaining(self, node):
+        return self.wallOfCell.get((node['x'], node['y']))
+
+    # The (start, end) nodes of the first wall containing the node, or None.
+    def wallContaining(self, node):
+        index = self.wallIndexContaining(node)
+        if index is None:
+            return None
+        return self.structureNodes[index], self.structureNodes[index + 1]
+
+    # The first perimeter cell reached walking from the node (not including it) in steps of (xStep, yStep), giving up
+    # at the limit of the varying coordinate. Returns None when no wall is reached.
+    def firstCellFrom(self, node, xStep, yStep, limit):
+        x, y = node['x'], node['y']
+        if xStep != 0:
+            for x in range(x + xStep, limit, xStep):
+                if (x, y) in self.wallOfCell:
+                    return {'x': x, 'y': y}
+        else:
+            for y in range(y + yStep, limit, yStep):
+                if (x, y) in self.wallOfCell:
+                    return {'x': x, 'y': y}
+        return None
+
+    # Even-odd test of whether a point lies inside the structure. Points on the perimeter are not expected.
+    def containsPoint(self, x, y):
+        inside = False
+        nodes = self.structureNodes
+        for index in range(len(nodes) - 1):
+            currentNode = nodes[index]
+            nextNode = nodes[index + 1]
+            if (currentNode['y'] > y) != (nextNode['y'] > y):
+                crossingX = (nextNode['x'] - currentNode['x']) * (y - currentNode['y']) / \
+                    (nextNode['y'] - currentNode['y']) + currentNode['x']
+                if x < crossingX:
+                    inside = not inside
+        return inside
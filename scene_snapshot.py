@@ -0,0 +1,81 @@
+import json
+import numpy as np
+
+from structure_buffer import StructureBuffer
+
+# File    : scene_snapshot.py
+# Classes : None
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Is used to save a projected scene (the structures, roads and inches per pixel produced by GenerateOSM) to
+#               a versioned binary snapshot, and to load it back. The snapshot is an uncompressed NumPy .npz of the
+#               flat coordinate buffers plus a small JSON header, so loading it takes milliseconds and gives exactly
+#               the same input to Dungeonify as the original fetch, without any network, parsing or projection.
+
+SCENE_FORMAT = 'dungeonify-scene'
+SCENE_FORMAT_VERSION = 1
+
+
+def saveScene(path, structures, roads, inchesPerPixel, previewPng=None, location=''):
+    if not isinstance(structures, StructureBuffer):
+        structures = StructureBuffer.fromStructures(structures)
+
+    # Roads are a list of node lists, which packs into the same ragged layout as the structures.
+    roadBuffer = StructureBuffer.fromStructures(
+        [{'nodes': road, 'speciality': False} for road in roads])
+
+    header = {'format': SCENE_FORMAT,
+              'version': SCENE_FORMAT_VERSION, 'location': location}
+
+    arrays = {
+        'header': np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8),
+        'structureCoordinates': structures.coordinates,
+        'structureOffsets': structures.offsets,
+        'structureSpeciality': structures.speciality,
+        'structureWayIds': structures.wayIds,
+        'structureWayVersions': structures.wayVersions,
+        'roadCoordinates': roadBuffer.coordinates,
+        'roadOffsets': roadBuffer.offsets,
+        'inchesPerPixel': np.array([inchesPerPixel['horizontal'], inchesPerPixel['vertical']], dtype=np.float64),
+    }
+    if previewPng is not None:
+        arrays['preview'] = np.frombuffer(previewPng, dtype=np.uint8)
+
+    # np.savez adds '.npz' to paths without it, so write through a file object to keep the name given.
+    with open(path, 'wb') as sceneFile:
+        np.savez(sceneFile, **arrays)
+
+
+# Returns (structures, roads, inchesPerPixel, header, previewPng). The structures are the same list of dicts
+# GenerateOSM.generate returns, or the StructureBuffer itself when compact is True.
+def loadScene(path, compact=False):
+    with np.load(path, allow_pickle=False) as scene:
+        header = json.loads(scene['header'].tobytes().decode('utf-8'))
+        if header.get('format') != SCENE_FORMAT:
+            raise ValueError(f"'{path}' is not a Dungeonify scene snapshot")
+        if header.get('version', 0) > SCENE_FORMAT_VERSION:
+            raise ValueError(
+                f"'{path}' is a newer scene snapshot (version {header['version']}) than this version of Dungeonify supports")
+
+        # Snapshots saved before way ids were kept do not have them.
+        wayIds, wayVersions = None, None
+        if 'structureWayIds' in scene.files:
+            wayIds, wayVersions = scene['structureWayIds'], scene['structureWayVersions']
+
+        structures = StructureBuffer(
+            scene['structureCoordinates'], scene['structureOffsets'], scene['structureSpeciality'], wayIds, wayVersions)
+        roadBuffer = StructureBuffer(scene['roadCoordinates'], scene['roadOffsets'], np.zeros(
+            len(scene['roadOffsets']) - 1, dtype=np.bool_))
+
+        horizontal, vertical = scene['inchesPerPixel'].tolist()
+        inchesPerPixel = {'horizontal': horizontal, 'vertical': vertical}
+
+        previewPng = None
+        if 'preview' in scene.files:
+            previewPng = scene['preview'].tobytes()
+
+    if not compact:
+        structures = structures.toStructures()
+    roads = [road['nodes'] for road in roadBuffer.toStructures()]
+
+    return structures, roads, inchesPerPixel, header, previewPng
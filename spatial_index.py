@@ -0,0 +1,166 @@
+import numpy as np
+
+# File    : spatial_index.py
+# Classes : StructureIndex
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : A uniform grid of buckets over the structures' bounding boxes, built once when a scene is loaded. Each
+#               structure is listed in every cell its bounding box overlaps, so a point, rectangle or lasso query
+#               only looks at the structures in the cells it touches, instead of every structure in the scene. The
+#               few candidates left are then tested exactly with the StructureBuffer's vectorised tests.
+
+
+class StructureIndex:
+    def __init__(self, structureBuffer, cellSize=None):
+        self.structureBuffer = structureBuffer
+        # (structures, 4) array of minX, minY, maxX, maxY.
+        self.bounds = structureBuffer.bounds()
+
+        if cellSize is None:
+            cellSize = self.defaultCellSize()
+        self.cellSize = float(cellSize)
+
+        self.build()
+
+    # About the size of a typical structure, so most structures sit in one to four cells.
+    def defaultCellSize(self):
+        if len(self.bounds) == 0:
+            return 1.0
+        extents = np.maximum(self.bounds[:, 2] - self.bounds[:, 0],
+                             self.bounds[:, 3] - self.bounds[:, 1])
+        return max(float(np.median(extents)), 1.0)
+
+    def build(self):
+        if len(self.bounds) == 0:
+            self.origin = np.zeros(2)
+            self.columns = self.rows = 0
+            self.cellKeys = np.zeros(0, dtype=np.int64)
+            self.cellStarts = np.zeros(1, dtype=np.int64)
+            self.cellStructures = np.zeros(0, dtype=np.int64)
+            return
+
+        self.origin = self.bounds[:, 0:2].min(axis=0)
+        firstCells = self.cellOf(self.bounds[:, 0:2])
+        lastCells = self.cellOf(self.bounds[:, 2:4])
+        self.columns = int(lastCells[:, 0].max()) + 1
+        self.rows = int(lastCells[:, 1].max()) + 1
+
+        # Every (structure, cell) pair, one row per cell each bounding box overlaps.
+        spans = lastCells - firstCells + 1
+        counts = spans[:, 0] * spans[:, 1]
+        structures = np.repeat(np.arange(len(self.bounds)), counts)
+        # The position of each pair within its structure's block of cells.
+        blockStarts = np.repeat(np.cumsum(counts) - counts, counts)
+        local = np.arange(len(structures)) - blockStarts
+        cellX = firstCells[structures, 0] + local // spans[structures, 1]
+        cellY = firstCells[structures, 1] + local % spans[structures, 1]
+        keys = cellX * self.rows + cellY
+
+        # Grouped by cell: the structures in cell cellKeys[i] are cellStructures[cellStarts[i]:cellStarts[i + 1]].
+        order = np.lexsort((structures, keys))
+        keys, structures = keys[order], structures[order]
+        self.cellKeys, firstOfCell = np.unique(keys, return_index=True)
+        self.cellStarts = np.append(firstOfCell, len(keys)).astype(np.int64)
+        self.cellStructures = structures
+
+    def cellOf(self, points):
+        return np.floor((np.asarray(points, dtype=np.float64) - self.origin) / self.cellSize).astype(np.int64)
+
+    # The structures listed in the cells from (firstX, firstY) to (lastX, lastY), sorted and without repeats.
+    def structuresInCells(self, firstX, firstY, lastX, lastY):
+        firstX, firstY = max(firstX, 0), max(firstY, 0)
+        lastX, lastY = min(lastX, self.columns - 1), min(lastY, self.rows - 1)
+        if firstX > lastX or firstY > lastY:
+            return np.zeros(0, dtype=np.int64)
+
+        columns = np.arange(firstX, lastX + 1)
+        rows = np.arange(firstY, lastY + 1)
+        keys = (columns[:, None] * self.rows + rows[None, :]).ravel()
+
+        positions = np.searchsorted(self.cellKeys, keys)
+        found = positions < len(self.cellKeys)
+        found[found] = self.cellKeys[positions[found]] == keys[found]
+        positions = positions[found]
+
+        if len(positions) == 1:
+            return self.cellStructures[self.cellStarts[positions[0]]:self.cellStarts[positions[0] + 1]]
+        return np.unique(np.concatenate([self.cellStructures[self.cellStarts[position]:self.cellStarts[position + 1]]
+                                         for position in positions] or [np.zeros(0, dtype=np.int64)]))
+
+    # The structures whose bounding box contains the point. Only these can contain the point itself.
+    def candidatesAtPoint(self, x, y):
+        cellX, cellY = self.cellOf((x, y)).tolist()
+        candidates = self.structuresInCells(cellX, cellY, cellX, cellY)
+
+        bounds = self.bounds[candidates]
+        keep = (bounds[:, 0] <= x) & (x <= bounds[:, 2]) & (
+            bounds[:, 1] <= y) & (y <= bounds[:, 3])
+        return candidates[keep]
+
+    # The index of the first structure containing the point, or None.
+    def structureAtPoint(self, x, y):
+        candidates = self.candidatesAtPoint(x, y)
+        if len(candidates) == 0:
+            return None
+        return self.structureBuffer.firstStructureContainingPoint(x, y, candidates)
+
+    # The structures touching the rectangle, or only those lying completely inside it when contained is True.
+    # The test is on bounding boxes, which is exact for contained.
+    def structuresInRectangle(self, minX, minY, maxX, maxY, contained=False):
+        minX, maxX = sorted((minX, maxX))
+        minY, maxY = sorted((minY, maxY))
+
+        (firstX, firstY), (lastX, lastY) = self.cellOf(
+            ((minX, minY), (maxX, maxY))).tolist()
+        candidates = self.structuresInCells(firstX, firstY, lastX, lastY)
+
+        bounds = self.bounds[candidates]
+        if contained:
+            keep = (bounds[:, 0] >= minX) & (bounds[:, 2] <= maxX) & (
+                bounds[:, 1] >= minY) & (bounds[:, 3] <= maxY)
+        else:
+            keep = (bounds[:, 0] <= maxX) & (bounds[:, 2] >= minX) & (
+                bounds[:, 1] <= maxY) & (bounds[:, 3] >= minY)
+        return candidates[keep]
+
+    # The structures whose nodes all lie inside the lasso, a list of {'x', 'y'} points drawn by the user which is
+    # closed back to its start. When touching is True a structure only needs one node inside.
+    def structuresInLasso(self, lasso, touching=False):
+        if len(lasso) < 3:
+            return np.zeros(0, dtype=np.int64)
+
+        lassoPoints = np.array([(point['x'], point['y'])
+                               for point in lasso], dtype=np.float64)
+        minX, minY = lassoPoints.min(axis=0)
+        maxX, maxY = lassoPoints.max(axis=0)
+        candidates = self.structuresInRectangle(
+            minX, minY, maxX, maxY, contained=not touching)
+        if len(candidates) == 0:
+            return candidates
+
+        buffer = self.structureBuffer
+        nodes = np.concatenate([buffer.nodes(candidate)
+                               for candidate in candidates])
+        owners = np.repeat(np.arange(len(candidates)),
+                           buffer.nodeCounts()[candidates])
+
+        inside = pointsInPolygon(nodes, lassoPoints)
+        insideCounts = np.bincount(
+            owners, weights=inside, minlength=len(candidates))
+        if touching:
+            return candidates[insideCounts > 0]
+        return candidates[insideCounts == buffer.nodeCounts()[candidates]]
+
+
+# Even-odd test of many points, an (n, 2) array, against one polygon, an (m, 2) array joined from its last point
+# back to its first. Returns a boolean array with one entry per point.
+def pointsInPolygon(points, polygon):
+    x, y = points[:, 0:1], points[:, 1:2]
+    xi, yi = polygon[:, 0], polygon[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+
+    straddles = (yi > y) != (yj > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossingX = (xj - xi) * (y - yi) / (yj - yi) + xi
+    crossings = np.count_nonzero(straddles & (x < crossingX), axis=1)
+    return (crossings % 2) == 1
@@ -0,0 +1,63 @@
+from PIL import Image
+
+# File    : sprite_atlas.py
+# Classes : SpriteAtlas
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Holds every wall, door, window, sill and pillar sprite ready to paste, built once per battlemap. Each
+#               sprite is scaled to the grid square size and kept in both orientations, so drawing a wall run is
+#               only pastes, without any resizing or rotating. Sprites are looked up by (category, variant,
+#               orientation), where the orientation is the way the wall run goes: 'horizontal' or 'vertical'.
+#
+#               Each sprite is kept as its RGB image and its alpha band, the two parts PIL's paste needs for
+#               alpha blending onto the RGB battlemap. PIL blends with straight (not premultiplied) alpha, so the
+#               colours are kept straight too; split up front, nothing is converted when pasting.
+
+ORIENTATIONS = ('horizontal', 'vertical')
+
+
+class SpriteAtlas:
+    def __init__(self, gridSize, assetPyramid=None):
+        # The width and height, in pixels, every sprite is scaled to.
+        self.gridSize = int(gridSize)
+        # An optional AssetPyramid the sprites are loaded from, already decoded and near the right size.
+        self.assetPyramid = assetPyramid
+        # (category, variant, orientation) --> (RGB image, alpha mask)
+        self.sprites = {}
+        # category --> number of variants
+        self.variantCounts = {}
+
+    # Loads the sprite files, in order, into the category. drawnVertically says which way the sprite's image runs;
+    # it is turned 90 degrees for the other orientation. Sprites which are the same either way (pillars) use None,
+    # and are never turned.
+    def addCategory(self, category, fileNames, drawnVertically=None):
+        if len(fileNames) == 0:
+            raise FileNotFoundError(f"No assets Found in '{category}'")
+
+        for variant, fileName in enumerate(fileNames):
+            if self.assetPyramid is None:
+                sprite = Image.open(fileName).convert('RGBA')
+            else:
+                sprite = self.assetPyramid.load(
+                    fileName, self.gridSize).convert('RGBA')
+            if sprite.size != (self.gridSize, self.gridSize):
+                sprite = sprite.resize((self.gridSize, self.gridSize))
+
+            for orientation in ORIENTATIONS:
+                if drawnVertically is None or drawnVertically == (orientation == 'vertical'):
+                    orientedSprite = sprite
+                else:
+                    orientedSprite = sprite.rotate(90.0)
+
+                self.sprites[(category, variant, orientation)] = (
+                    orientedSprite.convert('RGB'), orientedSprite.getchannel('A'))
+
+        self.variantCounts[category] = len(fileNames)
+
+    # Every (category, variant) pair of the category, to choose a sprite from.
+    def variants(self, category):
+        return [(category, variant) for variant in range(self.variantCounts[category])]
+
+    # The (RGB image, alpha mask) to paste.
+    def sprite(self, category, variant, orientation):
+        return self.sprites[(category, variant, orientation)]
@@ -0,0 +1,219 @@
+import math
+
+import numpy as np
+
+# File    : structure_buffer.py
+# Classes : StructureBuffer
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : A compact, array backed store of many structures' nodes. All the nodes sit in one flat float64 buffer and
+#               each structure is a slice of it given by an offsets array (structure i owns the nodes
+#               offsets[i] to offsets[i + 1]). Alongside are the per structure flags. This replaces the lists of
+#               {'x': ..., 'y': ...} dicts wherever every structure needs processing at once with NumPy.
+#
+#               Each structure may also carry the id and version of the OSM way it came from. They are -1 when not
+#               known, and structure dicts only have 'id' and 'version' keys when they are.
+
+
+class StructureBuffer:
+    def __init__(self, coordinates, offsets, speciality, wayIds=None, wayVersions=None):
+        # (total nodes, 2) array of x, y.
+        self.coordinates = np.ascontiguousarray(
+            coordinates, dtype=np.float64).reshape(-1, 2)
+        # (structures + 1) array, the start of each structure's nodes followed by the total number of nodes.
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int32)
+        # (structures) array, True for religious structures.
+        self.speciality = np.ascontiguousarray(speciality, dtype=np.bool_)
+        # (structures) arrays of the OSM way id and version of each structure, -1 when not known.
+        if wayIds is None:
+            wayIds = np.full(len(self.speciality), -1)
+        if wayVersions is None:
+            wayVersions = np.full(len(self.speciality), -1)
+        self.wayIds = np.ascontiguousarray(wayIds, dtype=np.int64)
+        self.wayVersions = np.ascontiguousarray(wayVersions, dtype=np.int64)
+
+        self.ringIndexes = None
+
+    # Packs the list of {'nodes': [{'x', 'y'}, ...], 'speciality': bool} dicts used through the pipeline.
+    @classmethod
+    def fromStructures(cls, structures):
+        counts = [len(structure['nodes']) for structure in structures]
+
+        offsets = np.zeros(len(structures) + 1, dtype=np.int32)
+        np.cumsum(counts, out=offsets[1:])
+
+        coordinates = np.fromiter((value for structure in structures for node in structure['nodes'] for value in (node['x'], node['y'])),
+                                  dtype=np.float64, count=2 * int(offsets[-1]))
+        speciality = [structure['speciality'] for structure in structures]
+        wayIds = [structure.get('id', -1) for structure in structures]
+        wayVersions = [structure.get('version', -1) for structure in structures]
+
+        return cls(coordinates, offsets, speciality, wayIds, wayVersions)
+
+    # Unpacks the buffer back into the list of dicts used through the pipeline.
+    def toStructures(self):
+        return [self.structure(index) for index in range(len(self))]
+
+    def structure(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        nodes = [{'x': x, 'y': y}
+                 for x, y in self.coordinates[start:end].tolist()]
+        structure = {'nodes': nodes, 'speciality': bool(self.speciality[index])}
+        if self.wayIds[index] >= 0:
+            structure['id'] = int(self.wayIds[index])
+            structure['version'] = int(self.wayVersions[index])
+        return structure
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # A view (no copy) of one structure's nodes as an (n, 2) array.
+    def nodes(self, index):
+        return self.coordinates[self.offsets[index]:self.offsets[index + 1]]
+
+    def nodeCounts(self):
+        return np.diff(self.offsets)
+
+    # The index of the structure which each node belongs to.
+    def structureIndexOfNodes(self):
+        return np.repeat(np.arange(len(self)), self.nodeCounts())
+
+    def nbytes(self):
+        return self.coordinates.nbytes + self.offsets.nbytes + self.speciality.nbytes + self.wayIds.nbytes + \
+            self.wayVersions.nbytes
+
+    # (structures, 4) array of each structure's minX, minY, maxX, maxY.
+    def bounds(self):
+        if len(self) == 0:
+            return np.zeros((0, 4))
+
+        starts = self.offsets[:-1]
+        minimums = np.minimum.reduceat(self.coordinates, starts, axis=0)
+        maximums = np.maximum.reduceat(self.coordinates, starts, axis=0)
+        return np.hstack((minimums, maximums))
+
+    # (structures, 2) array of the mean of each structure's nodes. The nodes are added one at a time, in order, for
+    # every structure at once, so the sums are exactly Python's sum() over each structure's coordinates.
+    def centroids(self):
+        counts = self.nodeCounts()
+        starts = self.offsets[:-1]
+        sums = np.zeros((len(self), 2))
+
+        for position in range(int(counts.max()) if len(self) > 0 else 0):
+            active = counts > position
+            sums[active] += self.coordinates[starts[active] + position]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return sums / counts[:, None]
+
+    # The index of the first node of each structure's longest edge (node i to node i + 1, without wrapping round
+    # to the first node), or -1 for a structure with no edges. The x and y differences are scaled before
+    # measuring, e.g. by the inches per pixel. Ties go to the first edge, as a running maximum would.
+    def longestEdges(self, xScale=1.0, yScale=1.0):
+        counts = self.nodeCounts()
+        longest = np.full(len(self), -1, dtype=np.int64)
+        if len(self.coordinates) < 2:
+            return longest
+
+        differences = self.coordinates[1:] - self.coordinates[:-1]
+        horizontal = differences[:, 0] * xScale
+        vertical = differences[:, 1] * yScale
+        lengths = np.sqrt(horizontal * horizontal + vertical * vertical)
+
+        # Edge i starts at node i. Edges leaving the last node of a structure join two structures, so are dropped.
+        isEdge = np.ones(len(lengths), dtype=np.bool_)
+        isEdge[(self.offsets[1:-1] - 1)[counts[:-1] > 0]] = False
+        edges = np.flatnonzero(isEdge)
+        owners = self.structureIndexOfNodes()[edges]
+
+        hasEdges = counts >= 2
+        firstEdges = np.searchsorted(owners, np.flatnonzero(hasEdges))
+        maximums = np.maximum.reduceat(lengths[edges], firstEdges)
+
+        isLongest = lengths[edges] == np.repeat(maximums, counts[hasEdges] - 1)
+        candidates = np.where(isLongest, edges, len(self.coordinates))
+        longest[hasEdges] = np.minimum.reduceat(candidates, firstEdges)
+        return longest
+
+    # A new buffer with each structure rotated anticlockwise about its origin by its angle in degrees. The sin and
+    # cos are taken once per structure, then every node is rotated at once, in the same order of operations as
+    # rotating each node on its own.
+    def rotated(self, origins, angles):
+        counts = self.nodeCounts()
+        radians = [math.radians(angle) for angle in np.asarray(angles).tolist()]
+        cosines = np.repeat([math.cos(angle) for angle in radians], counts)
+        sines = np.repeat([math.sin(angle) for angle in radians], counts)
+
+        nodeOrigins = np.repeat(np.asarray(origins, dtype=np.float64).reshape(-1, 2), counts, axis=0)
+        ox, oy = nodeOrigins[:, 0], nodeOrigins[:, 1]
+        px, py = self.coordinates[:, 0], self.coordinates[:, 1]
+
+        coordinates = np.empty_like(self.coordinates)
+        coordinates[:, 0] = ox + cosines * (px - ox) - sines * (py - oy)
+        coordinates[:, 1] = oy + sines * (px - ox) + cosines * (py - oy)
+
+        return StructureBuffer(coordinates, self.offsets.copy(), self.speciality.copy(), self.wayIds.copy(),
+                               self.wayVersions.copy())
+
+    # The index pairs making up every structure's edges. Like gui.point_in_polygon, the structures are closed
+    # (their first node repeats their last), so each ring is nodes 1 to n - 1 with the last joined back to node 1.
+    def ringEdges(self):
+        if self.ringIndexes is None:
+            counts = self.nodeCounts()
+            starts = self.offsets[:-1]
+
+            isRingNode = np.ones(len(self.coordinates), dtype=np.bool_)
+            isRingNode[starts[counts > 0]] = False
+            current = np.flatnonzero(isRingNode)
+
+            previous = current - 1
+            # The first ring node joins to the last node of its structure.
+            isFirstRingNode = np.isin(current, starts + 1)
+            previous[isFirstRingNode] = self.offsets[1:][counts >= 2] - 1
+
+            self.ringIndexes = (current, previous,
+                                self.structureIndexOfNodes()[current])
+
+        return self.ringIndexes
+
+    # Even-odd point in polygon test of one point against every structure (or just the structures in candidates)
+    # at once. Returns a boolean array with one entry per structure tested.
+    def containsPoint(self, x, y, candidates=None):
+        current, previous, owner = self.ringEdges()
+
+        if candidates is not None:
+            # The edges are grouped by structure, so each candidate's edges are one slice of them.
+            candidates = np.asarray(candidates, dtype=np.int64)
+            firstEdges = np.searchsorted(owner, candidates, side='left')
+            edgeCounts = np.searchsorted(
+                owner, candidates, side='right') - firstEdges
+            keep = np.repeat(firstEdges - np.cumsum(edgeCounts) + edgeCounts, edgeCounts) + \
+                np.arange(int(edgeCounts.sum()))
+            current, previous, owner = current[keep], previous[keep], owner[keep]
+
+        xi, yi = self.coordinates[current, 0], self.coordinates[current, 1]
+        xj, yj = self.coordinates[previous, 0], self.coordinates[previous, 1]
+
+        # A line from the point to infinity crosses this edge if one end is above and one below the point,
+        # and the crossing is to the right of the point.
+        straddles = (yi > y) != (yj > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossingX = (xj - xi) * (y - yi) / (yj - yi) + xi
+        crosses = straddles & (x < crossingX)
+
+        crossings = np.bincount(owner, weights=crosses, minlength=len(self))
+        inside = (crossings % 2) == 1
+
+        if candidates is not None:
+            return inside[candidates]
+        return inside
+
+    # The index of the first structure containing the point, or None.
+    def firstStructureContainingPoint(self, x, y, candidates=None):
+        inside = self.containsPoint(x, y, candidates)
+        hits = np.flatnonzero(inside)
+        if len(hits) == 0:
+            return None
+        if candidates is not None:
+            return int(np.min(np.asarray(candidates)[hits]))
+        return int(hits[0])
@@ -0,0 +1,89 @@
+import numpy as np
+
+from structure_buffer import StructureBuffer
+
+# File    : structure_metrics.py
+# Classes : None
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : Measures every structure in a selection at once from a StructureBuffer: the area, the perimeter, the
+#               distance coefficient used by the discovery metric and the bounding box. Each is a few NumPy passes
+#               over the flat coordinate buffer with the results summed per structure, rather than a Python loop
+#               over every node of every structure, so the evaluations can be run over large selections.
+#
+#               Structures are treated as rings, the last node joining back to the first, so they may be given
+#               open or closed (a repeated last node only adds an edge of no length).
+
+
+def asStructureBuffer(structures):
+    if isinstance(structures, StructureBuffer):
+        return structures
+    return StructureBuffer.fromStructures(structures)
+
+
+# The index of the node before each node in its structure's ring, the first node's being the last node.
+def previousNodeIndexes(structureBuffer):
+    counts = structureBuffer.nodeCounts()
+    previous = np.arange(len(structureBuffer.coordinates)) - 1
+    hasNodes = counts > 0
+    previous[structureBuffer.offsets[:-1][hasNodes]] = structureBuffer.offsets[1:][hasNodes] - 1
+    return previous
+
+
+# Sums one value per node into one total per structure, adding the nodes in order like a Python loop would.
+def sumPerStructure(structureBuffer, values):
+    return np.bincount(structureBuffer.structureIndexOfNodes(), weights=values, minlength=len(structureBuffer))
+
+
+# (structures) array of each structure's area by the shoelace formula, the same as Dungeonify.polyArea.
+def structureAreas(structures):
+    structureBuffer = asStructureBuffer(structures)
+    previous = previousNodeIndexes(structureBuffer)
+    x, y = structureBuffer.coordinates[:, 0], structureBuffer.coordinates[:, 1]
+
+    terms = x[previous] * y - x * y[previous]
+    return np.abs(sumPerStructure(structureBuffer, terms) * 0.5)
+
+
+# (structures) array of the length of each structure's walls. The x and y differences are scaled before measuring,
+# e.g. by the inches per pixel.
+def structurePerimeters(structures, xScale=1.0, yScale=1.0):
+    structureBuffer = asStructureBuffer(structures)
+    differences = structureBuffer.coordinates - \
+        structureBuffer.coordinates[previousNodeIndexes(structureBuffer)]
+
+    horizontal = differences[:, 0] * xScale
+    vertical = differences[:, 1] * yScale
+    return sumPerStructure(structureBuffer, np.sqrt(horizontal * horizontal + vertical * vertical))
+
+
+# (structures) array of the total distance from each structure's first node to each of its nodes, the same as
+# Dungeonify.calculateDistanceCoefficentBefore/After. The x and y differences are scaled as for the perimeter.
+def distanceCoefficients(structures, xScale=1.0, yScale=1.0):
+    structureBuffer = asStructureBuffer(structures)
+    firstNodes = np.repeat(
+        structureBuffer.offsets[:-1], structureBuffer.nodeCounts())
+    differences = structureBuffer.coordinates - \
+        structureBuffer.coordinates[firstNodes]
+
+    horizontal = differences[:, 0] * xScale
+    vertical = differences[:, 1] * yScale
+    return sumPerStructure(structureBuffer, np.sqrt(horizontal * horizontal + vertical * vertical))
+
+
+# (structures, 4) array of each structure's minX, minY, maxX, maxY.
+def structureBounds(structures):
+    return asStructureBuffer(structures).bounds()
+
+
+# All of the above for one selection, lengths in inches when given the inches per pixel.
+def structureMetrics(structures, inchesPerPixel=None):
+    structureBuffer = asStructureBuffer(structures)
+    xScale, yScale = 1.0, 1.0
+    if inchesPerPixel is not None:
+        xScale, yScale = inchesPerPixel['horizontal'], inchesPerPixel['vertical']
+
+    return {'area': structureAreas(structureBuffer),
+            'perimeter': structurePerimeters(structureBuffer, xScale, yScale),
+            'distanceCoefficient': distanceCoefficients(structureBuffer, xScale, yScale),
+            'bounds': structureBounds(structureBuffer)}
@@ -0,0 +1,144 @@
+# File    : tag_tables.py
+# Classes : TagClassifier
+# Author  : Adam Biggs (100197567)
+# Date    : 18/05/2022
+# Notes   : The declarative table deciding what each OSM way is (a structure, a road, etc.) from its tags, and the
+#               colour it is drawn in. The table is compiled once into dictionaries so classifying a way costs one
+#               lookup per tag, whatever order the tags come back from the OSM API in.
+
+
+# Categories a way can be classified as.
+STRUCTURE = 0
+SPECIALITY_STRUCTURE = 1  # Religious structures
+ROAD = 2
+NATURAL = 3  # Wildlife grass areas: the broads
+LANDUSE = 4  # Region of land: residential zoning
+BARRIER = 5  # e.g. fencing
+REMOVED = 6  # Just remove these
+UNTAGGED = 7
+UNKNOWN = 8
+
+STRUCTURE_CATEGORIES = (STRUCTURE, SPECIALITY_STRUCTURE)
+ROAD_CATEGORIES = (ROAD,)
+
+categoryColours = {
+    STRUCTURE: '0000FF',
+    SPECIALITY_STRUCTURE: '0AA0FF',
+    ROAD: 'FF0000',
+    NATURAL: '00FF00',
+    LANDUSE: '888888',
+    BARRIER: '0FFFF0',
+    REMOVED: 'FFFFFF',
+    UNTAGGED: 'FFFFFF',
+    UNKNOWN: '000000',
+}
+
+# (key, value, category), highest priority first. A value of None matches any value of the key.
+# When a way has several matching tags the highest priority one decides, so keys which say what the way
+# is (building, highway) beat keys which only describe it (name, access, source).
+tagRules = [
+    # Religious structures
+    ('amenity', 'place_of_worship', SPECIALITY_STRUCTURE),
+    ('building', 'church', SPECIALITY_STRUCTURE),
+    ('building', 'chapel', SPECIALITY_STRUCTURE),
+    ('building', 'cathedral', SPECIALITY_STRUCTURE),
+
+    # Structures
+    ('building', None, STRUCTURE),
+    ('house', None, STRUCTURE),
+
+    # Roads, paths, etc.
+    ('highway', None, ROAD),
+    ('footway', None, ROAD),
+    ('cycleway', None, ROAD),
+    ('cycleway:both', None, ROAD),
+    ('busway', None, ROAD),
+    ('aerialway', None, ROAD),
+    ('aeroway', None, ROAD),
+    ('public_footpath', None, ROAD),
+    ('bridge', None, ROAD),
+    ('electrified', None, ROAD),
+
+    ('barrier', None, BARRIER),
+    ('natural', None, NATURAL),
+    ('landuse', None, LANDUSE),
+
+    # Uses which are usually inside a structure.
+    ('craft', None, STRUCTURE),
+    ('emergency', None, STRUCTURE),
+    ('office', None, STRUCTURE),
+    ('shop', None, STRUCTURE),
+    ('sport', None, STRUCTURE),
+    ('telecom', None, STRUCTURE),
+    ('tourism', None, STRUCTURE),
+    ('brand', None, STRUCTURE),
+    ('abutters', None, STRUCTURE),
+
+    ('amenity', None, REMOVED),
+    ('leisure', None, REMOVED),
+    ('parking', None, REMOVED),
+    ('park', None, REMOVED),
+    ('boat', None, REMOVED),
+
+    # Descriptive keys, only used when nothing above matched.
+    ('name', None, STRUCTURE),
+    ('addr:housenumber', None, STRUCTURE),
+    ('addr:city', None, STRUCTURE),
+    ('access', None, ROAD),
+    ('designation', None, ROAD),
+    ('foot', None, ROAD),
+    ('bicycle', None, ROAD),
+    ('note', None, NATURAL),
+    ('source', None, NATURAL),
+    ('addr:postcode', None, REMOVED),
+    ('fixme', None, REMOVED),
+    ('', None, REMOVED),
+]
+
+
+class TagClassifier:
+    def __init__(self, rules=tagRules, colours=categoryColours):
+        # (key, value) --> (priority, category) and key --> (priority, category)
+        self.valueRules = {}
+        self.keyRules = {}
+        for priority, (key, value, category) in enumerate(rules):
+            if value is None:
+                self.keyRules.setdefault(key, (priority, category))
+            else:
+                self.valueRules.setdefault(
+                    (key, value), (priority, category))
+
+        # Cairo's r, g, b for each category, parsed once.
+        self.colours = {category: hexToRgb(colourHex)
+                        for category, colourHex in colours.items()}
+
+    def classify(self, tags):
+        if not tags:
+            return UNTAGGED
+
+        best = (len(self.valueRules) + len(self.keyRules), UNKNOWN)
+        for key, value in tags.items():
+            match = self.valueRules.get((key, value))
+            if match is not None and match < best:
+                best = match
+
+            match = self.keyRules.get(key)
+            if match is not None and match < best:
+                best = match
+
+        return best[1]
+
+    def colour(self, category):
+        return self.colours[category]
+
+
+def hexToRgb(colourHex):
+    return (int(colourHex[0:2], 16) / 256, int(colourHex[2:4], 16) / 256, int(colourHex[4:6], 16) / 256)
+
+
+def isStructureCategory(category):
+    return category in STRUCTURE_CATEGORIES
+
+
+def isRoadCategory(category):
+    return category in ROAD_CATEGORIES